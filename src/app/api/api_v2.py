@@ -2,15 +2,26 @@
 Anlık Dolar Kuru API v2 - SÜPER HIZLI ⚡⚡⚡
 Doğrudan anlikaltinfiyatlari.com API'sine bağlanır
 """
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-import asyncio
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from datetime import datetime
-from typing import List
+from typing import Optional
 import json
+import math
+import os
+import time
 
 from dolar_scraper_pro import DolarScraperPro
+from connection_manager import ConnectionManager
+from scheduler import PollingScheduler
+from wire_formats import BIN, JSON, LITE, LITE_SYMBOLS, SSE, encode_frame, epoch_ms, lite_schema, negotiate, to_lite
+from snapshot_delta import DeltaTracker, changed_symbols, filter_message
+from event_stream import KEEPALIVE_INTERVAL, SSEConnection
+from snapshot_bus import BusPublisher, BusSubscriber
+from shared_snapshot import SharedSnapshotStore
+from tick_history import HISTORY_CAPACITY, MAX_POINTS, TickHistory
+from snapshot_responses import FragmentCache, SnapshotResponses, etag_matches, json_dumps, parse_csv, project
 
 app = FastAPI(
     title="Anlık Dolar Kuru API v2",
@@ -27,80 +38,276 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Çalışma modu (API_ROLE):
+#   standalone - tek süreç, upstream'i kendisi çeker (varsayılan)
+#   ingest     - upstream'i çeken TEK süreç, snapshot'ları veriyoluna yayınlar
+#   worker     - upstream'e gitmez, veriyolundan beslenir, kendi istemcilerine dağıtır
+ROLE = os.environ.get("API_ROLE", "standalone")
+
+# Snapshot deposu (SNAPSHOT_STORE): memory (süreç içi, varsayılan) veya
+# mmap (paylaşılan bellek - ingest yazar, worker'lar kopyasız okur).
+# standalone'da okuyucu yoktur; her süreç kendi belleğini kullanır.
+store = None
+if os.environ.get("SNAPSHOT_STORE") == "mmap":
+    if ROLE in ("ingest", "worker"):
+        store = SharedSnapshotStore(writer=ROLE == "ingest")
+    else:
+        print(f"⚠️ SNAPSHOT_STORE=mmap sadece ingest/worker modunda kullanılır, {ROLE} için yok sayıldı")
+
 # Pro Scraper
-scraper = DolarScraperPro()
+scraper = DolarScraperPro(mirror=ROLE == "worker", store=store)
 
 # WebSocket Manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+manager = ConnectionManager()
+
+# WebSocket'e sadece değişiklikler gider
+deltas = DeltaTracker()
+
+# Sembol başına fiyat geçmişi (/api/history) - her süreç kendi tick'lerinden doldurur
+history = TickHistory(int(os.environ.get("HISTORY_CAPACITY", HISTORY_CAPACITY)))
+
+def record_history(data: dict, delta: Optional[dict]):
+    """Delta'da değişen sembollerin yeni değerleri geçmişe eklenir"""
+    if delta is None or not data:
+        return
+    timestamp = epoch_ms(data.get("timestamp"))
+    timestamp = timestamp / 1000 if timestamp is not None else time.time()
+    history.record(timestamp, data.get("currencies") or {}, changed_symbols(delta))
+
+async def apply_bus_message(message: dict):
+    """worker: ingest'ten gelen durumu uygular, delta'yı kendi istemcilerine yayınlar"""
+    if store is None:
+        # mmap deposunda durum zaten paylaşılan bellekte (veriyolundan önce yazılır)
+        scraper.import_state(message.get("state") or {})
+    if message.get("kind") != "quick":
+        return
+    deltas.apply(scraper.get_cached_data(), message.get("seq", deltas.seq))
+    delta = message.get("delta")
+    record_history(scraper.get_cached_data(), delta)
+    if delta is not None:
+        await manager.broadcast(delta, catchup=deltas.full_message(), symbols=changed_symbols(delta))
+
+# Süreçler arası snapshot veriyolu (sadece ingest / worker modunda)
+bus_publisher = BusPublisher() if ROLE == "ingest" else None
+bus_subscriber = BusSubscriber(apply_bus_message) if ROLE == "worker" else None
+bus = bus_publisher or bus_subscriber
+published_page_update = None
+
+def publish_snapshot(delta: Optional[dict] = None):
+    """ingest: son durumu (banka verisi değiştiyse onu da) worker'lara yayınlar"""
+    global published_page_update
+    if bus_publisher is None:
+        return
+    if store is not None:
+        # Durum paylaşılan bellekte; veriyolu sadece delta'yı taşır
+        bus_publisher.publish("quick", {"delta": delta, "seq": deltas.seq})
+        return
+    page_update = scraper.get_page_update_time()
+    if page_update != published_page_update:
+        published_page_update = page_update
+        bus_publisher.publish("page", {"state": scraper.export_state(page=True)})
+    bus_publisher.publish("quick", {"state": scraper.export_state(), "delta": delta, "seq": deltas.seq})
+
+# Stale-while-revalidate tazelik bütçeleri (saniye) - ortam değişkeniyle değiştirilebilir
+FRESHNESS_BUDGETS = {
+    "dolar": float(os.environ.get("FRESHNESS_BUDGET_DOLAR", 60)),
+    "banks": float(os.environ.get("FRESHNESS_BUDGET_BANKS", 60))
+}
+
+async def stale_while_revalidate(endpoint: str):
+    """
+    Cache'te ne varsa hemen döndürür; bütçeden eskiyse arka planda TEK yenileme başlatır.
+    Sadece sunulacak hiçbir banka verisi yoksa bekler.
+    (data, age, stale) döndürür.
+    """
+    data = scraper.get_full_snapshot()
+    if not data or 'banks' not in data:
+        data = await scraper.fetch_all_data()
+        return data, 0.0, bool(data.get('banks_stale'))
     
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+    page_update = scraper.get_page_update_time() or scraper.get_last_update_time()
+    age = (datetime.now() - page_update).total_seconds() if page_update else 0.0
+    stale = age > FRESHNESS_BUDGETS[endpoint] or bool(data.get('banks_stale'))
+    if stale:
+        scraper.revalidate_in_background()
+    return data, age, stale
+
+def with_staleness(response: Response, endpoint: str, age: float, stale: bool) -> Response:
+    """Yanıt gövdesine dokunmadan tazelik bilgisini başlıklara ekler"""
+    response.headers["Age"] = str(int(age))
+    response.headers["X-Data-Age"] = f"{age:.1f}"
+    response.headers["X-Freshness-Budget"] = str(int(FRESHNESS_BUDGETS[endpoint]))
+    response.headers["X-Stale"] = "true" if stale else "false"
+    return response
+
+# Hazır (serileştirilmiş + sıkıştırılmış) HTTP yanıtları
+responses = SnapshotResponses()
+
+def render_snapshot(request: Request, name: str, data: dict, build=lambda data: data, max_age: int = 1) -> Response:
+    """Snapshot başına bir kez kodlanan yanıtı döndürür (ETag / 304 destekli)"""
+    payload = responses.get(name, data, build, scraper.get_last_update_time(), max_age)
+    return payload.to_response(request)
+
+def currencies_view(data: dict) -> dict:
+    return {
+        "timestamp": data.get("timestamp"),
+        "api_time": data.get("api_time"),
+        "currencies": data.get("currencies", {})
+    }
+
+def banks_view(data: dict) -> dict:
+    return {
+        "timestamp": data.get("timestamp"),
+        "banks": data.get("banks", []),
+        "bank_count": len(data.get("banks", []))
+    }
+
+# Sembol / alan parçaları - snapshot başına bir kez kodlanır
+currency_fragments = FragmentCache()
+bank_fragments = FragmentCache()
+
+def filtered_currencies_body(data: dict, symbols, fields) -> bytes:
+    """{"timestamp", "api_time", "currencies": {seçili semboller}} - parçalar birleştirilir"""
+    currencies = data.get("currencies", {})
+    selected = [symbol for symbol in (symbols or currencies) if symbol in currencies]
+    parts = [
+        currency_fragments.fragment(data, ("key", symbol), lambda: symbol) + b":" +
+        currency_fragments.fragment(data, (symbol, fields), lambda: project(currencies[symbol], fields))
+        for symbol in selected
+    ]
+    timestamp = currency_fragments.fragment(data, "timestamp", lambda: data.get("timestamp"))
+    api_time = currency_fragments.fragment(data, "api_time", lambda: data.get("api_time"))
+    return (b'{"timestamp":' + timestamp + b',"api_time":' + api_time +
+            b',"currencies":{' + b",".join(parts) + b"}}")
+
+def filtered_banks_body(data: dict, codes, fields) -> bytes:
+    """
+    {"timestamp", "banks": [seçili bankalar], "bank_count"} - parçalar birleştirilir.
+    codes küçük harflidir; banka kodları da küçük harfe çevrilerek karşılaştırılır.
+    """
+    banks = data.get("banks", [])
+    selected = [
+        index for index, bank in enumerate(banks)
+        if codes is None or (bank.get("code") or "").lower() in codes
+    ]
+    parts = [
+        bank_fragments.fragment(data, (index, fields), lambda: project(banks[index], fields))
+        for index in selected
+    ]
+    timestamp = bank_fragments.fragment(data, "timestamp", lambda: data.get("timestamp"))
+    return (b'{"timestamp":' + timestamp + b',"banks":[' + b",".join(parts) +
+            b'],"bank_count":' + str(len(parts)).encode() + b"}")
+
+# Zamanlayıcı - Duvar saatine hizalı, adaptif aralıklar
+scheduler = PollingScheduler()
+
+# Her saniye güncelle
+async def update_data():
+    """HIZLI veri günceller ve WebSocket'e yayınlar ⚡"""
+    # Sadece API'den hızlı çek (banka verileri olmadan)
+    data = await scraper.fetch_quick()
     
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+    # Sadece değişenler yayınlanır; fiyat oynamadıysa hiçbir şey gönderilmez
+    delta = deltas.update(data)
+    record_history(data, delta)
+    if delta is not None:
+        await manager.broadcast(delta, catchup=deltas.full_message(), symbols=changed_symbols(delta))
+    publish_snapshot(delta)
     
-    async def broadcast(self, message: dict):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                disconnected.append(connection)
-        
-        for conn in disconnected:
-            self.disconnect(conn)
+    return data
 
-manager = ConnectionManager()
+# Her 30 saniyede bir tam veri güncelle (banka verileri dahil)
+async def update_full_data():
+    """TAM veri günceller (banka dahil)"""
+    data = await scraper.fetch_all_data()
+    publish_snapshot()
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Tam veri güncellendi (banka dahil)")
+    return data
 
-# Background task - Her saniye güncelle
-async def update_data_periodically():
-    """Her 1 saniyede bir HIZLI veri günceller ⚡"""
-    while True:
-        try:
-            # Sadece API'den hızlı çek (banka verileri olmadan)
-            data = await scraper.fetch_quick()
-            
-            if manager.active_connections:
-                await manager.broadcast({
-                    "type": "update",
-                    "data": data
-                })
-            
-        except Exception as e:
-            print(f"Güncelleme hatası: {e}")
-        
-        # 1 saniye bekle
-        await asyncio.sleep(1)
+def usdtry_price(data: dict):
+    """Oynaklık ölçümü için USDTRY değeri"""
+    return (data.get("currencies") or {}).get("USDTRY", {}).get("value")
 
-# Her 30 saniyede bir tam veri güncelle (banka verileri dahil)
-async def update_full_data_periodically():
-    """Her 30 saniyede bir TAM veri günceller (banka dahil)"""
-    while True:
-        try:
-            await asyncio.sleep(30)
-            data = await scraper.fetch_all_data()
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Tam veri güncellendi (banka dahil)")
-        except Exception as e:
-            print(f"Tam güncelleme hatası: {e}")
+def has_subscribers() -> bool:
+    """Bu süreçte veya (ingest ise) herhangi bir worker'da istemci var mı"""
+    if manager.active_connections:
+        return True
+    return bus_publisher is not None and bus_publisher.remote_clients() > 0
+
+async def report_bus_clients():
+    """worker: istemci sayısını ingest'in zamanlayıcısına bildirir"""
+    bus_subscriber.report_clients(len(manager.active_connections))
+
+# Upstream döngüleri sadece upstream'i çeken süreçte çalışır
+if ROLE != "worker":
+    scheduler.add_job(
+        "quick", update_data,
+        interval=1,
+        idle_interval=5,
+        closed_interval=30,
+        fast_interval=0.5,
+        has_subscribers=has_subscribers,
+        volatility_price=usdtry_price
+    )
+    scheduler.add_job(
+        "full", update_full_data,
+        interval=30,
+        closed_interval=300
+    )
+else:
+    scheduler.add_job("bus_report", report_bus_clients, interval=5)
+# Gönderimi takılan WebSocket istemcilerini at
+scheduler.add_job("ws_reaper", manager.evict_stalled, interval=5)
+# Sessiz bağlantılara ping (bağlantı başına timer yerine ortak çark)
+scheduler.add_job("heartbeat", manager.heartbeat, interval=1)
 
 @app.on_event("startup")
 async def startup_event():
-    print("🚀 API v2 başlatılıyor...")
+    print(f"🚀 API v2 başlatılıyor... ({ROLE})")
+    
+    if bus_subscriber is not None:
+        # worker: veri veriyolundan gelir, upstream'e gidilmez
+        bus_subscriber.start()
+        scheduler.start()
+        print(f"📨 Veriyoluna bağlanılıyor: {bus_subscriber.path}")
+        return
+    
+    if bus_publisher is not None:
+        # Upstream'e gitmeden önce: ikinci bir ingest süreci burada durur
+        await bus_publisher.start()
+    
+    if store is not None:
+        # Depo kilidi veriyolu kilidinden sonra: reddedilen ingest başlığa dokunmaz
+        store.open()
+    
+    # Paylaşılan HTTP oturumunu aç
+    await scraper.start()
     
     # İlk veriyi çek
     await scraper.fetch_all_data()
     print("✅ İlk veri çekildi")
     
-    # Background task'ları başlat
-    asyncio.create_task(update_data_periodically())
-    asyncio.create_task(update_full_data_periodically())
+    if bus_publisher is not None:
+        publish_snapshot()
+        print(f"📨 Veriyolu yayında: {bus_publisher.path}")
+    
+    # Zamanlanmış işleri başlat
+    scheduler.start()
     print("⚡ Anlık güncelleme başlatıldı (1 saniye)")
     print("🏦 Banka güncelleme başlatıldı (30 saniye)")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scheduler.stop()
+    if bus_subscriber is not None:
+        await bus_subscriber.stop()
+    if bus_publisher is not None:
+        await bus_publisher.stop()
+    if store is not None:
+        store.close()
+    await scraper.close()
+    print("🛑 HTTP oturumu kapatıldı")
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """Ana sayfa"""
@@ -129,7 +336,7 @@ async def root():
             
             <div class="endpoint">
                 <span class="method">GET</span> <code>/api/quick</code>
-                <p>⚡ En hızlı endpoint - Sadece döviz kurları (~250ms)</p>
+                <p>⚡ En hızlı endpoint - Bellekteki snapshot, <code>?max_age=</code> ile tazelik sınırı</p>
             </div>
             
             <div class="endpoint">
@@ -168,93 +375,369 @@ async def root():
         <div class="card">
             <h2>💡 WebSocket Örneği</h2>
             <pre><code>const ws = new WebSocket('ws://localhost:8000/ws');
-ws.onmessage = (e) => {
-    const data = JSON.parse(e.data);
-    console.log('Dolar:', data.data.currencies.USDTRY.value);
+let state = null, seq = 0;
+
+ws.onmessage = (event) => {
+    const msg = JSON.parse(event.data);
+    if (msg.type === 'initial' || msg.type === 'snapshot') {
+        state = msg.data; seq = msg.seq;
+    } else if (msg.type === 'delta') {
+        if (msg.seq &lt;= seq) return;                       // eski delta
+        if (msg.seq !== seq + 1) { ws.send('resync'); return; }
+        for (const [symbol, fields] of Object.entries(msg.changes.currencies || {})) {
+            Object.assign(state.currencies[symbol] ||= {}, fields);
+        }
+        seq = msg.seq;
+    }
+    console.log('Dolar:', state.currencies.USDTRY.value);
 };</code></pre>
         </div>
     </body>
     </html>
     """
 
+def snapshot_age() -> Optional[float]:
+    last_update = scraper.get_last_update_time()
+    return (datetime.now() - last_update).total_seconds() if last_update else None
+
+def default_quick_max_age() -> float:
+    """Polling aralığı + son çekme süresi (arka plan döngüsünün garanti ettiği tazelik)"""
+    job = scheduler.jobs.get("quick")
+    if job is None:
+        # worker: tazelik ingest'in döngüsüne bağlı, burada upstream'e gidilemez
+        return math.inf
+    return job.current_interval + (job.last_duration or 0)
+
 @app.get("/api/quick")
-async def get_quick():
-    """⚡ En hızlı endpoint - Sadece API verisi"""
-    return await scraper.fetch_quick()
+async def get_quick(
+    request: Request,
+    max_age: Optional[float] = Query(None, ge=0, description="Kabul edilen en eski snapshot yaşı (saniye)"),
+    format: str = Query(JSON, pattern="^(json|lite)$", description="json veya lite")
+):
+    """⚡ En hızlı endpoint - Bellekteki snapshot, sadece daha tazesi istenirse upstream"""
+    if max_age is None:
+        max_age = default_quick_max_age()
+    
+    data = scraper.get_cached_data()
+    age = snapshot_age()
+    if data is None or age is None or age > max_age:
+        data = await scraper.fetch_quick()
+        age = snapshot_age() if data is scraper.get_cached_data() else 0.0
+    
+    if format == LITE:
+        payload = responses.get("quick:lite", data, to_lite, scraper.get_last_update_time())
+    else:
+        payload = responses.get("quick", data, lambda data: data, scraper.get_last_update_time())
+    headers = payload.headers()
+    headers["Age"] = str(int(age or 0))
+    headers["X-Data-Age"] = f"{age or 0:.3f}"
+    if etag_matches(request, payload.etag):
+        return Response(status_code=304, headers=headers)
+    
+    # Yaş gövdeye yeniden kodlama yapmadan eklenir: {...} → {...,"snapshot_age":x}
+    body = payload.body[:-1] + b',"snapshot_age":' + f"{age or 0:.3f}".encode() + b"}"
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/api/dolar")
-async def get_dolar():
+async def get_dolar(request: Request):
     """Tam dolar verisi (banka dahil)"""
-    data = scraper.get_cached_data()
-    if not data or 'banks' not in data:
-        data = await scraper.fetch_all_data()
-    return data
+    data, age, stale = await stale_while_revalidate("dolar")
+    return with_staleness(render_snapshot(request, "dolar", data), "dolar", age, stale)
 
 @app.get("/api/currencies")
-async def get_currencies():
-    """Tüm döviz kurları"""
+async def get_currencies(
+    request: Request,
+    symbols: Optional[str] = Query(None, description="Virgülle ayrılmış semboller, ör. USDTRY,EURTRY"),
+    fields: Optional[str] = Query(None, description="Virgülle ayrılmış alanlar, ör. value"),
+    format: str = Query(JSON, pattern="^(json|lite)$", description="json veya lite (sembol/alan filtresi yok sayılır)")
+):
+    """Tüm döviz kurları (isteğe bağlı sembol filtresi ve alan seçimi)"""
     data = scraper.get_cached_data()
     if not data:
         data = await scraper.fetch_quick()
     
-    return {
-        "timestamp": data.get("timestamp"),
-        "api_time": data.get("api_time"),
-        "currencies": data.get("currencies", {})
-    }
+    if format == LITE:
+        return render_snapshot(request, "currencies:lite", data, to_lite)
+    
+    symbol_list, field_list = parse_csv(symbols, upper=True), parse_csv(fields)
+    if symbol_list is None and field_list is None:
+        return render_snapshot(request, "currencies", data, currencies_view)
+    return render_snapshot(
+        request, ("currencies", symbol_list, field_list), data,
+        lambda data: filtered_currencies_body(data, symbol_list, field_list)
+    )
 
 @app.get("/api/banks")
-async def get_banks():
-    """Banka dolar kurları"""
-    data = scraper.get_cached_data()
-    if not data or 'banks' not in data:
-        data = await scraper.fetch_all_data()
+async def get_banks(
+    request: Request,
+    codes: Optional[str] = Query(None, description="Virgülle ayrılmış banka kodları, ör. ziraat,akbank"),
+    fields: Optional[str] = Query(None, description="Virgülle ayrılmış alanlar, ör. buy,sell")
+):
+    """Banka dolar kurları (isteğe bağlı banka filtresi ve alan seçimi)"""
+    data, age, stale = await stale_while_revalidate("banks")
     
-    return {
-        "timestamp": data.get("timestamp"),
-        "banks": data.get("banks", []),
-        "bank_count": len(data.get("banks", []))
+    code_list, field_list = parse_csv(codes, lower=True), parse_csv(fields)
+    if code_list is None and field_list is None:
+        response = render_snapshot(request, "banks", data, banks_view)
+    else:
+        response = render_snapshot(
+            request, ("banks", code_list, field_list), data,
+            lambda data: filtered_banks_body(data, code_list, field_list)
+        )
+    return with_staleness(response, "banks", age, stale)
+
+@app.get("/api/schema")
+async def get_schema(
+    format: str = Query(LITE, description="lite veya bin (bin frame düzeni dahil)")
+):
+    """lite / bin formatlarının sembol sırası ve isimleri"""
+    return lite_schema(scraper.get_cached_data(), BIN if format == BIN else LITE)
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Epoch milisaniye veya ISO 8601 → epoch saniye (geçersizse ValueError)"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value) / 1000
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.get("/api/history")
+async def get_history(
+    symbol: str = Query(..., description="Sembol, ör. USDTRY"),
+    start: Optional[str] = Query(None, alias="from", description="Başlangıç (epoch ms veya ISO 8601)"),
+    end: Optional[str] = Query(None, alias="to", description="Bitiş (epoch ms veya ISO 8601)"),
+    max_points: int = Query(MAX_POINTS, ge=2, le=MAX_POINTS, description="En fazla nokta (fazlası seyreltilir)")
+):
+    """📈 Sembolün bellekteki fiyat geçmişi - t: epoch ms, v: değer (sadece değişim anları)"""
+    try:
+        start_time, end_time = parse_time(start), parse_time(end)
+    except ValueError:
+        return Response(
+            content=json_dumps({"error": "from / to epoch ms veya ISO 8601 olmalı"}),
+            status_code=400, media_type="application/json"
+        )
+    symbol = symbol.upper()
+    result = history.query(symbol, start_time, end_time, max_points)
+    if result is None:
+        return Response(
+            content=json_dumps({"error": f"{symbol} için geçmiş yok"}),
+            status_code=404, media_type="application/json"
+        )
+    times, values = result
+    body = {
+        "symbol": symbol,
+        "count": len(times),
+        "t": [int(timestamp * 1000) for timestamp in times],
+        "v": values
     }
+    return Response(content=json_dumps(body), media_type="application/json", headers={"Cache-Control": "no-cache"})
 
 @app.get("/api/status")
 async def get_status():
     """API durumu"""
     last_update = scraper.get_last_update_time()
-    return {
+    # Sayaçlar her istekte değiştiği için önceden kodlanmaz, sadece hızlı encoder kullanılır
+    status = {
         "status": "running",
         "version": "2.0.0",
+        "role": ROLE,
         "last_update": last_update.isoformat() if last_update else None,
         "websocket_connections": len(manager.active_connections),
+        "websocket": {**manager.snapshot(), **deltas.stats()},
+        "single_flight": scraper.get_single_flight_stats(),
+        "page_parses": scraper.get_parse_stats(),
+        "circuit_breaker": scraper.api_breaker.snapshot(),
+        "sources": scraper.sources.snapshot(),
+        "scheduler": scheduler.snapshot(),
+        "responses": responses.snapshot(),
+        "bus": bus.snapshot() if bus is not None else None,
+        "store": store.snapshot() if store is not None else {"backend": "memory"},
+        "history": history.snapshot(),
         "features": {
-            "direct_api": True,
+            "direct_api": scraper.is_api_available(),
             "websocket": True,
             "update_interval": "1 second",
             "bank_update_interval": "30 seconds"
         }
     }
+    return Response(content=json_dumps(status), media_type="application/json", headers={"Cache-Control": "no-cache"})
+
+# Tek komutta kabul edilen en fazla sembol
+MAX_COMMAND_SYMBOLS = 64
+
+def known_symbols() -> frozenset:
+    """Abone olunabilecek semboller: lite sırası + snapshot'taki semboller"""
+    return frozenset(LITE_SYMBOLS) | frozenset((scraper.get_cached_data() or {}).get("currencies", {}))
+
+def split_symbols(symbols) -> tuple:
+    """(bilinen semboller, bilinmeyenler) - '*' bilinen sayılır"""
+    universe = known_symbols()
+    known = tuple(symbol for symbol in symbols if symbol == "*" or symbol in universe)
+    unknown = tuple(symbol for symbol in symbols if symbol != "*" and symbol not in universe)
+    return known, unknown
+
+def query_symbols(value: Optional[str]) -> Optional[tuple]:
+    """?symbols= parametresi; bilinmeyenler yok sayılır, hiçbiri kalmazsa tüm semboller"""
+    symbols = parse_csv(value, upper=True)
+    if symbols is None:
+        return None
+    return split_symbols(symbols)[0] or None
+
+def parse_command(message: str) -> Optional[dict]:
+    """
+    İstemci komutu: 'resync', {"type": "resync" | "subscribe" | "unsubscribe", "symbols": [...]}
+    veya {"type": "throttle", "interval": 5}. Komut değilse None (pong ile yanıtlanır)
+    """
+    if message.strip() == "resync":
+        return {"type": "resync"}
+    try:
+        command = json.loads(message)
+    except ValueError:
+        return None
+    if not isinstance(command, dict) or command.get("type") not in ("resync", "subscribe", "unsubscribe", "throttle"):
+        return None
+    if command["type"] == "throttle":
+        try:
+            command["interval"] = float(command.get("interval") or 0)
+        except (TypeError, ValueError):
+            return {"type": "error", "message": "interval saniye cinsinden sayı olmalı"}
+        return command
+    symbols = command.get("symbols") or ()
+    if isinstance(symbols, str):
+        symbols = symbols.split(",")
+    if not isinstance(symbols, (list, tuple)) or len(symbols) > MAX_COMMAND_SYMBOLS:
+        return {"type": "error", "message": f"symbols en fazla {MAX_COMMAND_SYMBOLS} elemanlı bir liste olmalı"}
+    command["symbols"] = parse_csv(",".join(str(symbol) for symbol in symbols), upper=True) or ()
+    return command
+
+async def handle_command(conn_id: int, command: dict):
+    """resync / subscribe / unsubscribe - yanıt olarak süzülmüş tam snapshot"""
+    if command["type"] == "error":
+        await manager.send_personal(conn_id, json_dumps(command).decode("utf-8"))
+        return
+    if command["type"] == "throttle":
+        interval = manager.set_interval(conn_id, command["interval"])
+        await manager.send_personal(conn_id, json_dumps({"type": "throttled", "interval": interval}).decode("utf-8"))
+        return
+    if command["type"] != "resync":
+        # Bilinmeyen semboller indekse girmez, yanıtta ayrıca bildirilir
+        requested, unknown = split_symbols(command["symbols"])
+        if command["type"] == "subscribe":
+            symbols = manager.subscribe(conn_id, requested)
+        else:
+            symbols = manager.unsubscribe(conn_id, requested, known_symbols())
+        reply = {"type": "subscribed", "symbols": "*" if symbols is None else sorted(symbols)}
+        if unknown:
+            reply["unknown"] = list(unknown)
+        await manager.send_personal(conn_id, json_dumps(reply).decode("utf-8"))
+    
+    full = deltas.full_message("snapshot", fallback=scraper.get_cached_data())
+    if full:
+        await manager.send_message(conn_id, full)
+
+def initial_frames(fmt: str, symbols=None, last_seq: Optional[int] = None) -> list:
+    """
+    Bağlantı başı mesajları. last_seq (SSE Last-Event-ID) verilirse ve
+    arada kaçan delta'lar yayın geçmişindeyse snapshot yerine onlar gönderilir.
+    """
+    frames = []
+    cached = scraper.get_cached_data()
+    # lite / bin: önce sembol sözlüğü (bir kez, JSON metin)
+    if fmt in (LITE, BIN):
+        frames.append(json_dumps(lite_schema(cached, fmt)).decode("utf-8"))
+    
+    subscribed = frozenset(symbols) if symbols else None
+    if last_seq is not None:
+        if last_seq == deltas.seq:
+            return frames
+        ticks = manager.ticks_since(last_seq) if last_seq < deltas.seq else None
+        if ticks and ticks[-1].message.get("seq") == deltas.seq:
+            return frames + [tick.frame(fmt, subscribed) for tick in ticks]
+    
+    # İlk veri - sonraki delta'lar bu seq'ten devam eder
+    initial = deltas.full_message("initial", fallback=cached)
+    if initial:
+        frames.append(encode_frame(filter_message(initial, subscribed), fmt))
+    return frames
+
+def parse_interval(value: Optional[str]) -> float:
+    try:
+        return float(value or 0)
+    except ValueError:
+        return 0.0
+
+@app.get("/api/stream")
+async def stream(
+    request: Request,
+    symbols: Optional[str] = Query(None, description="Virgülle ayrılmış semboller (örn. USDTRY,XAUUSD)"),
+    interval: float = Query(0, ge=0, description="Güncellemeler arası en az süre (saniye)")
+):
+    """
+    📡 Server-Sent Events - WebSocket ile aynı tick'ler (initial, delta, snapshot)
+    Last-Event-ID ile yeniden bağlanan istemci sadece kaçırdığı delta'ları alır.
+    """
+    subscribed = query_symbols(symbols)
+    last_seq = request.headers.get("last-event-id") or request.query_params.get("lastEventId")
+    last_seq = int(last_seq) if last_seq and last_seq.isdigit() else None
+    connection = SSEConnection()
+    
+    async def events():
+        conn_id = await manager.connect(
+            connection, SSE, None,
+            lambda: initial_frames(SSE, subscribed, last_seq),
+            interval, subscribed,
+            ping_interval=KEEPALIVE_INTERVAL
+        )
+        # Gönderici task'ı henüz çalışmadı; tampon buradan sonra tek frame
+        connection.limit()
+        try:
+            async for frame in connection.stream():
+                yield frame
+        finally:
+            manager.disconnect(conn_id)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket - Anlık veri güncellemeleri"""
-    await manager.connect(websocket)
-    print(f"🔌 Yeni WebSocket bağlantısı. Toplam: {len(manager.active_connections)}")
+    """
+    WebSocket - Anlık veri güncellemeleri (json, lite veya bin, subprotocol ile)
+    ?interval=5 → en fazla 5 saniyede bir güncelleme
+    ?symbols=USDTRY,XAUUSD → baştan sadece bu semboller
+    """
+    fmt, subprotocol = negotiate(websocket)
+    interval = parse_interval(websocket.query_params.get("interval"))
+    symbols = query_symbols(websocket.query_params.get("symbols"))
     
     try:
-        # İlk veriyi gönder
-        cached = scraper.get_cached_data()
-        if cached:
-            await websocket.send_json({"type": "initial", "data": cached})
-        
-        # Bağlantıyı açık tut
+        conn_id = await manager.connect(
+            websocket, fmt, subprotocol,
+            lambda: initial_frames(fmt, symbols),
+            interval, symbols
+        )
+    except WebSocketDisconnect:
+        return
+    print(f"🔌 Yeni WebSocket bağlantısı ({fmt}). Toplam: {len(manager.active_connections)}")
+    
+    try:
+        # Bağlantıyı açık tut - sessiz bağlantılara ping heartbeat çarkından gider
         while True:
-            try:
-                message = await asyncio.wait_for(websocket.receive_text(), timeout=30)
-                await websocket.send_json({"type": "pong", "message": message})
-            except asyncio.TimeoutError:
-                await websocket.send_json({"type": "ping"})
+            message = await websocket.receive_text()
+            manager.touch(conn_id)
+            command = parse_command(message)
+            if command is not None:
+                await handle_command(conn_id, command)
+                continue
+            await manager.send_personal(conn_id, json_dumps({"type": "pong", "message": message}).decode("utf-8"))
                 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
+    finally:
+        manager.disconnect(conn_id)
         print(f"🔌 Bağlantı kesildi. Kalan: {len(manager.active_connections)}")
 
 if __name__ == "__main__":
@@ -0,0 +1,505 @@
+"""
+Sıcak yol benchmark paketi - çekme → dönüştürme → sunma
+Gerçek siteye dokunmaz; fixtures/ ve fake_upstream.py kullanır.
+
+Ölçülenler:
+- transform: _transform_api_data işlem/sn
+- parse:     her HTML çıkarma fonksiyonu, her parser backend'i için
+- http:      /api/quick, /api/currencies, /api/banks istek/sn ve p99
+- ws:        100 / 1k / 10k bağlantıya broadcast süresi
+- ws:        aynı ölçümler delta mesajı için (üretimde her tick'te giden)
+- connections: hedef bağlantı sayısında (varsayılan 50k) bağlanma, heartbeat
+             turu, delta teslimatı, bağlantıyı kapama süresi ve bağlantı başı
+             bellek (tracemalloc)
+
+Sonuçlar JSON olarak yazılır ve başka bir çalıştırmayla karşılaştırılabilir.
+
+Kullanım:
+    python benchmarks/bench_hotpath.py                       # hepsi
+    python benchmarks/bench_hotpath.py --only transform,ws   # seçili bölümler
+    python benchmarks/bench_hotpath.py --compare benchmarks/results/eski.json
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+import aiohttp
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+
+API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(API_DIR))
+
+from dolar_scraper_pro import DolarScraperPro  # noqa: E402
+from fake_upstream import FakeUpstreamConfig, start_fake_upstream  # noqa: E402
+from page_parsers import PARSERS  # noqa: E402
+
+FIXTURES_DIR = API_DIR / "fixtures"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+SECTIONS = ("transform", "parse", "http", "ws", "connections")
+HTTP_ENDPOINTS = ("/api/quick", "/api/currencies", "/api/banks")
+WS_CONNECTION_COUNTS = (100, 1000, 10000)
+WS_FORMATS = ("json", "lite", "bin")
+# Worker süreci başına hedeflenen eşzamanlı bağlantı sayısı (README'de belgeli)
+CONNECTION_TARGET = 50000
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def time_call(func: Callable, min_seconds: float) -> Dict:
+    """func'ı en az min_seconds boyunca çalıştırır, işlem/sn ve çağrı başı süre döndürür"""
+    func()  # ısınma
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        for _ in range(10):
+            func()
+        calls += 10
+        elapsed = time.perf_counter() - start
+    return {
+        "ops_per_sec": round(calls / elapsed, 1),
+        "us_per_op": round(elapsed / calls * 1e6, 2)
+    }
+
+
+# ---------------------------------------------------------------------------
+# transform
+# ---------------------------------------------------------------------------
+
+def bench_transform(args) -> Dict:
+    scraper = DolarScraperPro()
+    raw = json.loads((FIXTURES_DIR / "total.json").read_bytes())
+    return {"_transform_api_data": time_call(lambda: scraper._transform_api_data(raw), args.min_seconds)}
+
+
+# ---------------------------------------------------------------------------
+# parse
+# ---------------------------------------------------------------------------
+
+def bench_parse(args) -> Dict:
+    html = (FIXTURES_DIR / "dolar.html").read_bytes()
+    results = {}
+    for name, parser_cls in PARSERS.items():
+        parser = parser_cls()
+        if name == "soup":
+            from bs4 import BeautifulSoup
+            doc = BeautifulSoup(html, 'html.parser')
+        else:
+            import lxml.html
+            doc = lxml.html.fromstring(html)
+
+        results[name] = {
+            "parse": time_call(lambda: parser.parse(html), args.min_seconds),
+            "_extract_general_rates": time_call(lambda: parser._extract_general_rates(doc), args.min_seconds),
+            "_extract_bank_rates": time_call(lambda: parser._extract_bank_rates(doc), args.min_seconds),
+            "_extract_currencies_from_page": time_call(lambda: parser._extract_currencies_from_page(doc), args.min_seconds)
+        }
+    return results
+
+
+# ---------------------------------------------------------------------------
+# http
+# ---------------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(session: aiohttp.ClientSession, url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"API ayağa kalkmadı: {url}")
+
+
+async def load(session: aiohttp.ClientSession, url: str, concurrency: int, duration: float) -> Dict:
+    """concurrency kadar işçi ile duration saniye boyunca istek atar"""
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+async def bench_http_async(args) -> Dict:
+    runner, upstream_url, _ = await start_fake_upstream(
+        FakeUpstreamConfig(latency_ms=args.upstream_latency, walk=0.0005, seed=1)
+    )
+    port = free_port()
+    env = dict(os.environ, UPSTREAM_BASE_URL=upstream_url, TCMB_URL=upstream_url + "/kurlar/today.xml")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_v2:app", "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, env=env, stdout=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{port}"
+    results = {}
+    try:
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await wait_until_up(session, base + "/api/status")
+            for endpoint in HTTP_ENDPOINTS:
+                results[endpoint] = await load(session, base + endpoint, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+        await runner.cleanup()
+    return results
+
+
+def bench_http(args) -> Dict:
+    return asyncio.run(bench_http_async(args))
+
+
+# ---------------------------------------------------------------------------
+# ws
+# ---------------------------------------------------------------------------
+
+class DeliveryCounter:
+    """Tüm istemcilere teslimatın bittiği anı yakalar"""
+
+    def __init__(self):
+        self.delivered = 0
+        self.target = 0
+        self.done = asyncio.Event()
+
+    def expect(self, total: int):
+        self.target = total
+        self.done.clear()
+        if self.delivered >= total:
+            self.done.set()
+
+    def add(self):
+        self.delivered += 1
+        if self.delivered >= self.target:
+            self.done.set()
+
+
+class FakeWebSocket:
+    """Starlette WebSocket'in gönderme tarafını taklit eder (ağ yok, kodlama var)"""
+
+    def __init__(self, counter: DeliveryCounter = None):
+        self.bytes_sent = 0
+        self.messages = 0
+        self.counter = counter
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data: str):
+        self.bytes_sent += len(data.encode("utf-8"))
+        self.messages += 1
+        if self.counter is not None:
+            self.counter.add()
+
+    async def send_bytes(self, data: bytes):
+        self.bytes_sent += len(data)
+        self.messages += 1
+        if self.counter is not None:
+            self.counter.add()
+
+    async def send_json(self, data, mode: str = "text"):
+        # Starlette ile aynı kodlama
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def ws_messages() -> Dict[str, Dict]:
+    """
+    Yayınlanan mesaj türleri: tam snapshot (bağlanma / resync / geride kalan)
+    ve üretimde her tick'te giden delta (iki sembol değişmiş)
+    """
+    from snapshot_delta import DeltaTracker
+
+    scraper = DolarScraperPro()
+    raw = json.loads((FIXTURES_DIR / "total.json").read_bytes())
+    deltas = DeltaTracker()
+    deltas.update(scraper._transform_api_data(raw))
+    snapshot = deltas.full_message("snapshot")
+    for symbol in ("USDTRY", "EURTRY"):
+        raw[symbol] = round(raw[symbol] * 1.0001, 4)
+    delta = deltas.update(scraper._transform_api_data(raw))
+    return {"snapshot": snapshot, "delta": delta}
+
+
+async def bench_ws_async(args) -> Dict:
+    from connection_manager import ConnectionManager
+
+    messages = ws_messages()
+    cases = [(count, fmt, kind) for kind in messages for fmt in WS_FORMATS for count in WS_CONNECTION_COUNTS]
+
+    results = {}
+    for count, fmt, kind in cases:
+        message = messages[kind]
+        manager = ConnectionManager()
+        counter = DeliveryCounter()
+        sockets = [FakeWebSocket(counter) for _ in range(count)]
+        ids = [await manager.connect(websocket, fmt) for websocket in sockets]
+
+        # broadcast(): çağrının kendisi; delivery: son istemciye ulaşana kadar
+        timings, deliveries = [], []
+        for round_number in range(1, args.ws_rounds + 1):
+            counter.expect(count * round_number)
+            started = time.perf_counter()
+            await manager.broadcast(message)
+            timings.append(time.perf_counter() - started)
+            await counter.done.wait()
+            deliveries.append(time.perf_counter() - started)
+
+        key = str(count) if fmt == "json" else f"{count}_{fmt}"
+        results[key if kind == "snapshot" else f"{key}_{kind}"] = {
+            "broadcast_ms_p50": round(percentile(timings, 50) * 1000, 3),
+            "broadcast_ms_max": round(max(timings) * 1000, 3),
+            "delivery_ms_p50": round(percentile(deliveries, 50) * 1000, 3),
+            "bytes_per_client": sockets[0].bytes_sent // max(1, sockets[0].messages)
+        }
+
+        for conn_id in ids:
+            manager.disconnect(conn_id)
+        await asyncio.sleep(0)
+    return results
+
+
+def bench_ws(args) -> Dict:
+    return asyncio.run(bench_ws_async(args))
+
+
+# ---------------------------------------------------------------------------
+# connections
+# ---------------------------------------------------------------------------
+
+async def connection_memory(count: int) -> float:
+    """
+    Bağlantı başına Python yığın belleği (KB, gönderici task'ı dahil).
+    RSS farkı allocator'ın serbest alanlarını yeniden kullanmasıyla gürültülü
+    (hatta negatif) çıktığı için tracemalloc ile ayrı bir turda ölçülür.
+    """
+    from connection_manager import ConnectionManager
+
+    manager = ConnectionManager()
+    sockets = [FakeWebSocket() for _ in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        ids = [await manager.connect(websocket, "lite") for websocket in sockets]
+        await asyncio.sleep(0)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    for conn_id in ids:
+        manager.disconnect(conn_id)
+    await asyncio.sleep(0)
+    return used / count / 1024
+
+
+async def bench_connections_async(args) -> Dict:
+    from connection_manager import ConnectionManager
+
+    # Üretimdeki gibi her tick bir delta
+    message = ws_messages()["delta"]
+    count = args.connections
+    # Kısa ping aralığı: tüm bağlantıların ping'i tek bir turda dolar
+    ping_interval = 2.0
+
+    manager = ConnectionManager()
+    counter = DeliveryCounter()
+    sockets = [FakeWebSocket(counter) for _ in range(count)]
+    started = time.perf_counter()
+    ids = [await manager.connect(websocket, "lite", ping_interval=ping_interval) for websocket in sockets]
+    connect_seconds = time.perf_counter() - started
+    await asyncio.sleep(0)
+
+    # Süresi dolan yokken heartbeat turu (zamanlayıcı her saniye çağırır)
+    idle_ticks = []
+    for _ in range(20):
+        started = time.perf_counter()
+        await manager.heartbeat()
+        idle_ticks.append(time.perf_counter() - started)
+
+    deliveries = []
+    for round_number in range(1, args.ws_rounds + 1):
+        counter.expect(count * round_number)
+        started = time.perf_counter()
+        await manager.broadcast(message)
+        await counter.done.wait()
+        deliveries.append(time.perf_counter() - started)
+    delta_bytes = sockets[0].bytes_sent // max(1, sockets[0].messages)
+
+    started = time.perf_counter()
+    for conn_id in ids:
+        manager.touch(conn_id)
+    touch_seconds = time.perf_counter() - started
+
+    # Tüm bağlantılar sessiz kalır → hepsinin ping'i aynı anda dolar;
+    # tur başına en fazla max_pings gider, kalanlar sonraki turlara kayar
+    await asyncio.sleep(ping_interval + 1.1)
+    ping_ticks = []
+    pinged = 0
+    while pinged < count:
+        started = time.perf_counter()
+        pinged += await manager.heartbeat()
+        ping_ticks.append(time.perf_counter() - started)
+        await asyncio.sleep(manager.wheel.resolution)
+
+    started = time.perf_counter()
+    for conn_id in ids:
+        manager.disconnect(conn_id)
+    disconnect_seconds = time.perf_counter() - started
+    await asyncio.sleep(0)
+
+    return {
+        str(count): {
+            "connect_us_per_conn": round(connect_seconds / count * 1e6, 2),
+            "heartbeat_idle_ms_p50": round(percentile(idle_ticks, 50) * 1000, 3),
+            "heartbeat_ping_tick_ms_p50": round(percentile(ping_ticks, 50) * 1000, 3),
+            "heartbeat_ping_tick_ms_max": round(max(ping_ticks) * 1000, 3),
+            "heartbeat_ping_ticks": len(ping_ticks),
+            "pings_per_tick": manager.max_pings,
+            "delivery_ms_p50": round(percentile(deliveries, 50) * 1000, 3),
+            "touch_us_per_conn": round(touch_seconds / count * 1e6, 3),
+            "disconnect_us_per_conn": round(disconnect_seconds / count * 1e6, 2),
+            "delta_bytes_per_client": delta_bytes,
+            "kb_per_conn": round(await connection_memory(count), 2)
+        }
+    }
+
+
+def bench_connections(args) -> Dict:
+    return asyncio.run(bench_connections_async(args))
+
+
+# ---------------------------------------------------------------------------
+# çıktı / karşılaştırma
+# ---------------------------------------------------------------------------
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def flatten(data: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+
+def compare(current: Dict, previous: Dict):
+    """Ortak metrikleri yan yana yazdırır"""
+    now = flatten(current["results"])
+    before = flatten(previous["results"])
+    print("=" * 60)
+    print(f"📊 Karşılaştırma: {previous['meta']['commit']} → {current['meta']['commit']}")
+    print("=" * 60)
+    for key in sorted(now.keys() & before.keys()):
+        old, new = before[key], now[key]
+        change = f"{(new / old - 1) * 100:+.1f}%" if old else "n/a"
+        print(f"   {key:<60} {old:>12} → {new:>12}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sıcak yol benchmark paketi")
+    parser.add_argument("--only", default=",".join(SECTIONS), help=f"Virgülle ayrılmış bölümler: {', '.join(SECTIONS)}")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="Mikro benchmark başına süre")
+    parser.add_argument("--duration", type=float, default=5.0, help="HTTP uç noktası başına yük süresi")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--upstream-latency", type=float, default=20, help="Sahte upstream gecikmesi (ms)")
+    parser.add_argument("--ws-rounds", type=int, default=20)
+    parser.add_argument("--connections", type=int, default=CONNECTION_TARGET, help="connections bölümü bağlantı sayısı")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None, help="Karşılaştırılacak önceki sonuç dosyası")
+    args = parser.parse_args()
+
+    sections = [section.strip() for section in args.only.split(",") if section.strip()]
+    runners = {"transform": bench_transform, "parse": bench_parse, "http": bench_http, "ws": bench_ws, "connections": bench_connections}
+
+    results = {}
+    for section in sections:
+        if section not in runners:
+            parser.error(f"Bilinmeyen bölüm: {section}")
+        print(f"⏱️ {section}...")
+        results[section] = runners[section](args)
+        print(json.dumps(results[section], indent=2, ensure_ascii=False))
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: str(value) for key, value in vars(args).items()}
+        },
+        "results": results
+    }
+
+    output = args.output or RESULTS_DIR / f"{commit}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"💾 Sonuçlar: {output}")
+
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
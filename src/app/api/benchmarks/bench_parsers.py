@@ -0,0 +1,66 @@
+"""
+Parser micro-benchmark
+fixtures/*.html dosyaları üzerinde parser backend'lerini karşılaştırır.
+
+Kullanım:
+    python benchmarks/bench_parsers.py [--repeat 50]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(API_DIR))
+
+from page_parsers import PARSERS  # noqa: E402
+
+FIXTURES_DIR = API_DIR / "fixtures"
+
+
+def bench(parser, html: bytes, repeat: int) -> float:
+    """Ortalama parse süresini milisaniye olarak döndürür"""
+    parser.parse(html)  # ısınma
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parser.parse(html)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parser backend karşılaştırması")
+    arg_parser.add_argument("--repeat", type=int, default=50)
+    args = arg_parser.parse_args()
+
+    fixtures = sorted(FIXTURES_DIR.glob("*.html"))
+    if not fixtures:
+        print(f"❌ Fixture bulunamadı: {FIXTURES_DIR}")
+        return 1
+
+    for fixture in fixtures:
+        html = fixture.read_bytes()
+        print("=" * 60)
+        print(f"📄 {fixture.name} ({len(html) / 1024:.0f} KB)")
+        print("=" * 60)
+
+        results = {}
+        baseline = None
+        for name, parser_cls in PARSERS.items():
+            parser = parser_cls()
+            output = parser.parse(html)
+            if baseline is None:
+                baseline = output
+            elif output != baseline:
+                print(f"⚠️ {name} çıktısı {next(iter(PARSERS))} ile aynı değil!")
+
+            results[name] = bench(parser, html, args.repeat)
+
+        slowest = max(results.values())
+        for name, elapsed in sorted(results.items(), key=lambda item: item[1]):
+            print(f"   {name:<6} {elapsed:8.2f} ms/parse   x{slowest / elapsed:.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
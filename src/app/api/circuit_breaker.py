@@ -0,0 +1,143 @@
+"""
+Circuit breaker - Doğrudan API yolu için
+Hata oranı penceresi, üstel bekleme süresi ve half-open deneme istekleri ile
+API geçici olarak bozulduğunda sayfa scraping'e düşer, düzelince geri döner.
+"""
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    closed    → istekler serbest, sonuçlar pencereye yazılır
+    open      → istekler engellenir, bekleme süresi dolunca half_open
+    half_open → sınırlı sayıda deneme isteği; başarı → closed, hata → open (süre x2).
+                Sonuçsuz biten deneme release_probe() ile hakkı geri verir; hiç
+                dönmeyen deneme half_open_timeout sonra yeni denemeye yer açar.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        failure_rate_threshold: float = 0.5,
+        min_calls: int = 3,
+        base_cooldown: float = 2.0,
+        max_cooldown: float = 120.0,
+        half_open_max_calls: int = 1,
+        half_open_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.window_seconds = window_seconds
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.half_open_max_calls = half_open_max_calls
+        self.half_open_timeout = half_open_timeout
+        self._clock = clock
+
+        self.state = CLOSED
+        self._results: Deque[Tuple[float, bool]] = deque()
+        self._opened_at: Optional[float] = None
+        self._trips = 0
+        self._half_open_calls = 0
+        self._probe_started_at: Optional[float] = None
+        self._total_trips = 0
+
+    @property
+    def cooldown(self) -> float:
+        """Şu anki bekleme süresi - her ardışık açılışta iki katına çıkar"""
+        if self._trips == 0:
+            return 0.0
+        return min(self.base_cooldown * (2 ** (self._trips - 1)), self.max_cooldown)
+
+    def allow_request(self) -> bool:
+        """İsteğe izin verilip verilmediğini döndürür (half_open'da deneme hakkı harcar)"""
+        if self.state == OPEN:
+            if self._clock() - self._opened_at < self.cooldown:
+                return False
+            self.state = HALF_OPEN
+            self._half_open_calls = 0
+
+        if self.state == HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                if self._clock() - self._probe_started_at < self.half_open_timeout:
+                    return False
+                # Deneme sonuç kaydetmeden kaybolmuş - hakkı yenile
+                self._half_open_calls = 0
+            self._half_open_calls += 1
+            self._probe_started_at = self._clock()
+
+        return True
+
+    def release_probe(self):
+        """Deneme sonuçsuz bitti (iptal / sonucu bilinmiyor) - hakkı geri ver"""
+        if self.state == HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            # Deneme başarılı - hızlı yola geri dön
+            self._close()
+            return
+        self._record(True)
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            # Deneme başarısız - daha uzun bekle
+            self._open()
+            return
+        self._record(False)
+        if self.state == CLOSED and self._failure_rate_exceeded():
+            self._open()
+
+    def _record(self, ok: bool):
+        now = self._clock()
+        self._results.append((now, ok))
+        while self._results and now - self._results[0][0] > self.window_seconds:
+            self._results.popleft()
+
+    def _failure_rate_exceeded(self) -> bool:
+        if len(self._results) < self.min_calls:
+            return False
+        return self.failure_rate() >= self.failure_rate_threshold
+
+    def failure_rate(self) -> float:
+        if not self._results:
+            return 0.0
+        failures = sum(1 for _, ok in self._results if not ok)
+        return failures / len(self._results)
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = self._clock()
+        self._trips += 1
+        self._total_trips += 1
+        self._half_open_calls = 0
+
+    def _close(self):
+        self.state = CLOSED
+        self._opened_at = None
+        self._trips = 0
+        self._half_open_calls = 0
+        self._results.clear()
+
+    def snapshot(self) -> Dict:
+        """/api/status için durum özeti"""
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.cooldown - (self._clock() - self._opened_at)), 2)
+        return {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate(), 3),
+            "window_calls": len(self._results),
+            "cooldown_seconds": self.cooldown,
+            "retry_in_seconds": retry_in,
+            "consecutive_trips": self._trips,
+            "total_trips": self._total_trips
+        }
@@ -0,0 +1,485 @@
+"""
+WebSocket bağlantı yöneticisi - eşzamanlı, backpressure farkında yayın
+
+broadcast() sadece son mesajı paylaşılan bir slota yazar ve bekleyenleri
+uyandırır; hiçbir gönderimi beklemez. Uyandırma yine de bekleyen gönderici
+sayısıyla orantılıdır (ortak future her bekleyen için bir callback
+planlar). Her bağlantının kendi gönderici task'ı vardır:
+- Yavaş istemci geride kalırsa ara tick'ler atlanır (son değer kazanır);
+  mesajlar delta ise atlanan delta'lar yerine tam snapshot gönderilir
+- Bir gönderim stall_timeout'tan uzun sürerse bağlantı atılır
+- Bir istemcinin yavaşlığı diğerlerini bekletmez
+- İstemci en az 'interval' saniye arayla güncelleme isteyebilir; arada
+  gelen tick'ler bekletilmez, gönderim anında en son durum gider
+
+Sembol aboneliği: varsayılan olarak istemci her şeyi alır. subscribe ile
+sembol listesi seçen istemciler sembol → abone indeksine girer; bir tick
+sadece değişen sembollere abone bağlantıları uyandırır ve onlara kendi
+sembolleriyle süzülmüş mesaj gider.
+
+Kayıt: bağlantılar artan bir bağlantı id'si ile tutulur (ekleme, silme,
+arama O(1)); dışarıdan tüm işlemler bu id ile yapılır. Canlılık kontrolü
+bağlantı başına timer yerine ortak bir timer wheel ile (heartbeat()):
+ping_interval boyunca iki yönde de trafik olmayan bağlantıya ping gider.
+"""
+from collections import deque
+from typing import Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Union
+from fastapi import WebSocket, WebSocketDisconnect
+import asyncio
+import itertools
+import time
+
+from heartbeat import TimerWheel
+from snapshot_delta import filter_message
+from wire_formats import JSON, encode_frame, ping_frame
+
+# Bu süreden uzun süren tek bir gönderim "takılmış" sayılır
+STALL_TIMEOUT = 10.0
+
+# Süzülmüş istemciler için saklanan son tick sayısı
+TICK_HISTORY = 16
+
+# İstemcinin isteyebileceği en uzun güncelleme aralığı (saniye)
+MAX_INTERVAL = 300.0
+
+# Bu süre boyunca trafik olmayan bağlantıya ping gönderilir (saniye)
+PING_INTERVAL = 30.0
+
+# Bir heartbeat turunda en fazla bu kadar ping; kalanlar sonraki turlara
+# kayar (aynı anda bağlanan binlerce istemcinin ping'i tek tura yığılmaz)
+MAX_PINGS_PER_TICK = 2000
+
+# Metin (json, lite) veya binary (bin) frame
+Frame = Union[str, bytes]
+
+
+async def send_frame(websocket: WebSocket, frame: Frame):
+    if isinstance(frame, bytes):
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+
+
+def clamp_interval(interval: float) -> float:
+    return min(max(float(interval), 0.0), MAX_INTERVAL)
+
+
+class Tick:
+    """Yayınlanmış bir tick ve format / abonelik başına kodlanmış halleri"""
+
+    def __init__(self, seq: int, message: dict, catchup: Optional[dict], symbols: Optional[FrozenSet[str]]):
+        self.seq = seq
+        self.message = message
+        self.catchup = catchup
+        # Değişen semboller; None → herkesi ilgilendirir
+        self.symbols = symbols
+        self.encoded: Dict[tuple, Frame] = {}
+
+    def relevant_to(self, symbols: Optional[FrozenSet[str]]) -> bool:
+        return symbols is None or self.symbols is None or not self.symbols.isdisjoint(symbols)
+
+    def frame(self, fmt: str, symbols: Optional[FrozenSet[str]], catchup: bool = False) -> Frame:
+        # Tick, format ve abonelik başına bir kez kodlanır, istemciler paylaşır
+        key = (catchup, fmt, symbols)
+        frame = self.encoded.get(key)
+        if frame is None:
+            message = self.catchup if catchup else self.message
+            frame = self.encoded[key] = encode_frame(filter_message(message, symbols), fmt)
+        return frame
+
+
+class ClientState:
+    """Bağlantı başına gönderim durumu"""
+
+    def __init__(self, conn_id: int, websocket: WebSocket, fmt: str, ping_interval: float = PING_INTERVAL):
+        self.id = conn_id
+        self.websocket = websocket
+        self.format = fmt
+        self.ping_interval = ping_interval
+        self.connected_at = time.time()
+        # İstemciden son gelen mesaj (monotonic)
+        self.last_seen = time.monotonic()
+        # None → tüm semboller
+        self.symbols: Optional[FrozenSet[str]] = None
+        self.sent_seq = 0
+        self.sending_since: Optional[float] = None
+        self.conflated = 0
+        # Güncellemeler arası en az süre (0 → her tick)
+        self.interval = 0.0
+        self.last_sent = self.last_seen
+        self.retune = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class ConnectionManager:
+    def __init__(self, stall_timeout: float = STALL_TIMEOUT, max_pings: int = MAX_PINGS_PER_TICK):
+        self.stall_timeout = stall_timeout
+        self.max_pings = max_pings
+        # bağlantı id → durum
+        self.connections: Dict[int, ClientState] = {}
+        self._ids = itertools.count(1)
+        self.wheel = TimerWheel()
+        # Süresi dolmuş, ping sırası bekleyen bağlantı id'leri
+        self._ping_queue: Deque[int] = deque()
+        # Gönderimi süren ping task'ları (referans tutulmazsa GC toplayabilir)
+        self._ping_tasks: Set[asyncio.Task] = set()
+
+        # sembol → o sembole abone (süzülmüş) istemciler
+        self.subscribers: Dict[str, Set[ClientState]] = {}
+        self.filtered: Set[ClientState] = set()
+
+        # Paylaşılan "son tick" slotu ve süzülmüş istemciler için kısa geçmiş
+        self._seq = 0
+        self._history: Deque[Tick] = deque(maxlen=TICK_HISTORY)
+        self._next_tick: Optional[asyncio.Future] = None
+
+        self.evicted = 0
+        self.conflated = 0
+        self.pings = 0
+
+    @property
+    def active_connections(self):
+        return self.connections.keys()
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        fmt: str = JSON,
+        subprotocol: Optional[str] = None,
+        greeting: Optional[Callable[[], List[Frame]]] = None,
+        interval: float = 0.0,
+        symbols: Optional[Iterable[str]] = None,
+        ping_interval: float = PING_INTERVAL
+    ) -> int:
+        """
+        greeting: bağlantıya tick'lerden önce gönderilecek mesajlar (schema, initial).
+        Tick sırası ile aynı anda alınır; böylece ilk veriden eski bir delta gitmez.
+        interval: güncellemeler arası en az süre (saniye)
+        symbols: baştan abone olunan semboller (None → hepsi)
+        Bağlantı id'sini döndürür.
+        """
+        await websocket.accept(subprotocol=subprotocol)
+        state = ClientState(next(self._ids), websocket, fmt, ping_interval)
+        state.interval = clamp_interval(interval)
+        state.sent_seq = self._seq
+        self.connections[state.id] = state
+        self.wheel.schedule(state.id, ping_interval)
+        if symbols:
+            self._set_symbols(state, frozenset(symbols))
+
+        frames = greeting() if greeting is not None else []
+        try:
+            async with state.lock:
+                for frame in frames:
+                    await self._send(state, frame, bounded=True)
+        except Exception:
+            self.disconnect(state.id)
+            raise
+        state.task = asyncio.create_task(self._sender(state))
+        return state.id
+
+    def disconnect(self, conn_id: int):
+        state = self.connections.pop(conn_id, None)
+        if state is None:
+            return
+        self.wheel.cancel(conn_id)
+        self._unindex(state)
+        if state.task is not None and state.task is not asyncio.current_task():
+            state.task.cancel()
+
+    def _index(self, state: ClientState):
+        if state.symbols is not None:
+            self.filtered.add(state)
+        for symbol in state.symbols or ():
+            self.subscribers.setdefault(symbol, set()).add(state)
+
+    def _unindex(self, state: ClientState):
+        self.filtered.discard(state)
+        for symbol in state.symbols or ():
+            subscribers = self.subscribers.get(symbol)
+            if subscribers is not None:
+                subscribers.discard(state)
+                if not subscribers:
+                    del self.subscribers[symbol]
+
+    def _set_symbols(self, state: ClientState, symbols: Optional[FrozenSet[str]]):
+        self._unindex(state)
+        state.symbols = symbols
+        self._index(state)
+        # Kendi event'ini bekleyen task yeni moda geçsin; ortak future'ı
+        # bekleyen zaten bir sonraki tick'te uyanır
+        state.wake.set()
+
+    def touch(self, conn_id: int):
+        """İstemciden mesaj geldi - sadece zaman damgası, çark ping anında bakar"""
+        state = self.connections.get(conn_id)
+        if state is not None:
+            state.last_seen = time.monotonic()
+
+    def set_interval(self, conn_id: int, interval: float) -> Optional[float]:
+        """Güncelleme aralığını değiştirir; bekleyen gönderici yeni aralığa göre uyanır"""
+        state = self.connections.get(conn_id)
+        if state is None:
+            return None
+        state.interval = clamp_interval(interval)
+        state.retune.set()
+        return state.interval
+
+    def subscribe(self, conn_id: int, symbols: Iterable[str]) -> Optional[FrozenSet[str]]:
+        """
+        Sembol ekler. Tüm sembolleri alan istemci ilk subscribe ile sadece
+        verilen sembollere geçer; '*' tekrar tüm sembollere döndürür.
+        """
+        state = self.connections.get(conn_id)
+        if state is None:
+            return None
+        symbols = frozenset(symbols)
+        if not symbols:
+            return state.symbols
+        if "*" in symbols:
+            self._set_symbols(state, None)
+        else:
+            self._set_symbols(state, (state.symbols or frozenset()) | symbols)
+        return state.symbols
+
+    def unsubscribe(
+        self,
+        conn_id: int,
+        symbols: Iterable[str],
+        universe: Iterable[str] = ()
+    ) -> Optional[FrozenSet[str]]:
+        """
+        Sembol çıkarır. universe: tüm sembolleri alan istemcinin çıkarma
+        sonrası kalacağı küme için bilinen semboller; '*' hepsini çıkarır.
+        """
+        state = self.connections.get(conn_id)
+        if state is None:
+            return None
+        symbols = frozenset(symbols)
+        if not symbols:
+            return state.symbols
+        current = state.symbols if state.symbols is not None else frozenset(universe)
+        self._set_symbols(state, frozenset() if "*" in symbols else current - symbols)
+        return state.symbols
+
+    def ticks_since(self, message_seq: int) -> Optional[List[Tick]]:
+        """
+        Mesaj seq'i message_seq'ten sonraki delta tick'leri (yeniden bağlanan
+        istemci için). Geçmişte boşluk varsa veya delta olmayan tick varsa None.
+        """
+        ticks = [tick for tick in self._history if (tick.message.get("seq") or 0) > message_seq]
+        for expected, tick in enumerate(ticks, start=message_seq + 1):
+            if tick.message.get("type") != "delta" or tick.message.get("seq") != expected:
+                return None
+        return ticks
+
+    async def send_personal(self, conn_id: int, frame: Frame):
+        """Tek bir istemciye mesaj (tick gönderimiyle araya girmeden)"""
+        state = self.connections.get(conn_id)
+        if state is None:
+            return
+        async with state.lock:
+            await self._send(state, frame, bounded=True)
+
+    async def send_message(self, conn_id: int, message: dict):
+        """Mesajı istemcinin formatı ve aboneliğine göre süzüp gönderir"""
+        state = self.connections.get(conn_id)
+        if state is None:
+            return
+        await self.send_personal(conn_id, encode_frame(filter_message(message, state.symbols), state.format))
+
+    async def broadcast(self, message: dict, catchup: Optional[dict] = None, symbols: Optional[Iterable[str]] = None):
+        """
+        Son mesajı yayınlar - hiçbir gönderimi beklemez; maliyeti uyandırılan
+        gönderici sayısıyla orantılıdır (O(N), gönderim değil uyandırma).
+        catchup: tick atlayan istemcilere message yerine gönderilecek tam durum
+        symbols: bu tick'te değişen semboller; None ise herkese gider.
+        Tüm sembolleri alanlar tek bir future ile, süzülmüş istemcilerden
+        sadece bu sembollere abone olanlar uyandırılır.
+        """
+        self._seq += 1
+        symbols = frozenset(symbols) if symbols is not None else None
+        self._history.append(Tick(self._seq, message, catchup, symbols))
+
+        waiter, self._next_tick = self._next_tick, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+        if symbols is None:
+            for state in self.filtered:
+                state.wake.set()
+            return
+        for symbol in symbols:
+            for state in self.subscribers.get(symbol, ()):
+                state.wake.set()
+
+    async def _wait(self, state: ClientState):
+        if state.symbols is not None:
+            await state.wake.wait()
+            return
+        if self._next_tick is None:
+            self._next_tick = asyncio.get_running_loop().create_future()
+        await self._next_tick
+
+    def _pending(self, state: ClientState):
+        """(gönderilecek tick, catchup mı) - ilgili yeni tick yoksa None"""
+        if state.sent_seq >= self._seq:
+            return None
+        latest = self._history[-1]
+        oldest = self._history[0].seq
+        if state.sent_seq + 1 < oldest and latest.catchup is not None:
+            # Geçmişin gerisinde kalmış - doğrudan son durum
+            skipped = self._seq - state.sent_seq - 1
+            state.conflated += skipped
+            self.conflated += skipped
+            return latest, True
+
+        relevant = [
+            tick for tick in self._history
+            if tick.seq > state.sent_seq and tick.relevant_to(state.symbols)
+        ]
+        if not relevant:
+            return None
+        # Geride kalındıysa sadece en son tick gönderilir
+        skipped = len(relevant) - 1
+        if skipped > 0:
+            state.conflated += skipped
+            self.conflated += skipped
+            if latest.catchup is not None:
+                return latest, True
+        return relevant[-1], False
+
+    async def _throttle(self, state: ClientState):
+        """Son gönderimden bu yana interval dolana kadar bekler (tick'lerle uyanmadan)"""
+        while state.interval > 0:
+            remaining = state.last_sent + state.interval - time.monotonic()
+            if remaining <= 0:
+                return
+            state.retune.clear()
+            try:
+                await asyncio.wait_for(state.retune.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    async def _sender(self, state: ClientState):
+        try:
+            while True:
+                await self._throttle(state)
+                state.wake.clear()
+                pending = self._pending(state)
+                if pending is None:
+                    state.sent_seq = self._seq
+                    await self._wait(state)
+                    continue
+
+                tick, catchup = pending
+                frame = tick.frame(state.format, state.symbols, catchup)
+                async with state.lock:
+                    await self._send(state, frame)
+                state.sent_seq = tick.seq
+                state.last_sent = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Gönderim hatası - bağlantı kopmuş
+            self.disconnect(state.id)
+
+    async def _send(self, state: ClientState, frame: Frame, bounded: bool = False):
+        """
+        state.lock altında tek gönderim; sending_since işaretlenir, takılan
+        gönderimi evict_stalled görür. bounded: gönderici task'ı dışındaki
+        gönderimler (greeting, kişisel yanıt, ping) stall_timeout ile sınırlıdır;
+        aşılırsa bağlantı atılır ve çağırana WebSocketDisconnect yükselir.
+        """
+        state.sending_since = time.monotonic()
+        try:
+            if not bounded:
+                await send_frame(state.websocket, frame)
+                return
+            try:
+                await asyncio.wait_for(send_frame(state.websocket, frame), self.stall_timeout)
+            except asyncio.TimeoutError:
+                await self._evict(state)
+                raise WebSocketDisconnect(code=1008)
+        finally:
+            state.sending_since = None
+
+    async def _evict(self, state: ClientState):
+        if state.id not in self.connections:
+            return
+        self.disconnect(state.id)
+        self.evicted += 1
+        try:
+            await asyncio.wait_for(state.websocket.close(code=1008), timeout=1)
+        except Exception:
+            pass
+
+    async def evict_stalled(self) -> int:
+        """Gönderimi stall_timeout'u aşan bağlantıları kapatır (zamanlayıcıdan çağrılır)"""
+        now = time.monotonic()
+        stalled = [
+            state for state in self.connections.values()
+            if state.sending_since is not None and now - state.sending_since > self.stall_timeout
+        ]
+        for state in stalled:
+            await self._evict(state)
+        return len(stalled)
+
+    async def heartbeat(self) -> int:
+        """
+        Çarkta süresi dolan bağlantılara bakar (zamanlayıcıdan her saniye).
+        Arada trafik olduysa kalan süre kadar yeniden kurulur; olmadıysa
+        ping kuyruğuna girer. Sadece süresi dolanlar için iş yapılır; tur
+        başına en fazla max_pings ping gider, kalanı sonraki turları bekler.
+        """
+        now = time.monotonic()
+        for conn_id in self.wheel.advance(now):
+            state = self.connections.get(conn_id)
+            if state is None:
+                continue
+            idle = now - max(state.last_seen, state.last_sent)
+            if idle < state.ping_interval:
+                self.wheel.schedule(conn_id, state.ping_interval - idle)
+            else:
+                self._ping_queue.append(conn_id)
+
+        pinged = 0
+        while self._ping_queue and pinged < self.max_pings:
+            conn_id = self._ping_queue.popleft()
+            state = self.connections.get(conn_id)
+            if state is None:
+                continue
+            self.wheel.schedule(conn_id, state.ping_interval)
+            if state.lock.locked():
+                # Gönderim sürüyor - ping gereksiz, takılırsa reaper atar
+                continue
+            task = asyncio.create_task(self._ping(state))
+            self._ping_tasks.add(task)
+            task.add_done_callback(self._ping_tasks.discard)
+            pinged += 1
+        self.pings += pinged
+        return pinged
+
+    async def _ping(self, state: ClientState):
+        try:
+            async with state.lock:
+                await self._send(state, ping_frame(state.format), bounded=True)
+        except Exception:
+            self.disconnect(state.id)
+
+    def snapshot(self) -> Dict:
+        return {
+            "connections": len(self.connections),
+            "filtered_connections": len(self.filtered),
+            "throttled_connections": sum(1 for state in self.connections.values() if state.interval > 0),
+            "subscribed_symbols": {symbol: len(states) for symbol, states in self.subscribers.items()},
+            "seq": self._seq,
+            "conflated_ticks": self.conflated,
+            "evicted": self.evicted,
+            "stall_timeout": self.stall_timeout,
+            "heartbeat_scheduled": len(self.wheel),
+            "pings_queued": len(self._ping_queue),
+            "pings": self.pings
+        }
@@ -3,11 +3,30 @@ Gelişmiş Dolar Kurları Scraper - Doğrudan API Erişimi
 anlikaltinfiyatlari.com'un kendi API'lerini kullanır
 """
 import aiohttp
-from bs4 import BeautifulSoup
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, Iterable, Optional
 import asyncio
-import json
+import hashlib
+import os
+
+from circuit_breaker import CircuitBreaker, OPEN
+from page_parsers import SoupPageParser, get_parser
+from rate_sources import DirectApiSource, SourceRegistry, TcmbSource
+from shared_snapshot import SharedSnapshotStore
+
+# Upstream adresleri - ortam değişkenleriyle değiştirilebilir (ör. fake_upstream.py)
+DEFAULT_UPSTREAM_BASE_URL = "https://anlikaltinfiyatlari.com"
+DEFAULT_TCMB_URL = "https://www.tcmb.gov.tr/kurlar/today.xml"
+
+# Bağlantı havuzu ayarları
+POOL_LIMIT = 100
+POOL_LIMIT_PER_HOST = 10
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+# Kaynak başına bağımsız zaman aşımları (saniye)
+API_TIMEOUT = 5
+PAGE_TIMEOUT = 10
 
 
 class DolarScraperPro:
@@ -17,10 +36,25 @@ class DolarScraperPro:
     2. Web scraping (yedek)
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        parser: str = "auto",
+        base_url: Optional[str] = None,
+        tcmb_url: Optional[str] = None,
+        mirror: bool = False,
+        store: Optional[SharedSnapshotStore] = None
+    ):
+        # mirror: upstream'e hiç gitmez; durum import_state() ile ingest sürecinden gelir
+        self.mirror = mirror
+        # Paylaşılan bellek deposu: yazıcı ise her güncellemeyi yazar,
+        # okuyucu ise getter'lar en son sürümü oradan alır
+        self.store = store
+        
         # API Endpoint'leri
-        self.api_url = "https://anlikaltinfiyatlari.com/socket/total.php"
-        self.page_url = "https://anlikaltinfiyatlari.com/doviz/dolar"
+        base_url = (base_url or os.environ.get("UPSTREAM_BASE_URL") or DEFAULT_UPSTREAM_BASE_URL).rstrip('/')
+        self.api_url = f"{base_url}/socket/total.php"
+        self.page_url = f"{base_url}/doviz/dolar"
+        self.tcmb_url = tcmb_url or os.environ.get("TCMB_URL") or DEFAULT_TCMB_URL
         
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
@@ -30,34 +64,126 @@ class DolarScraperPro:
         
         self._cache = None
         self._last_update = None
-        self._api_available = True
+        self._store_state: Optional[Dict] = None
+        # Kur kaynakları - sıra önceliktir, yavaş birincile karşı hedge yapılır
+        self.sources = SourceRegistry()
+        self.sources.register(DirectApiSource(self.api_url))
+        self.sources.register(TcmbSource(self.tcmb_url))
+        
+        # API bozulursa sayfaya düşer, düzelince otomatik geri döner
+        self.api_breaker = CircuitBreaker()
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # Sayfa parser'ı (lxml → BeautifulSoup yedek)
+        self.parser = get_parser(parser)
+        self._fallback_parser = SoupPageParser()
+        
+        # Single-flight: aynı türden eşzamanlı istekler tek upstream çağrısını paylaşır
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flight_stats: Dict[str, Dict[str, int]] = {}
+        
+        # Son başarılı sayfa verisi (banka + genel kurlar)
+        self._page_cache: Optional[Dict] = None
+        self._page_update: Optional[datetime] = None
+        
+        # Stale-while-revalidate: hızlı snapshot + son sayfa verisi birleşimi
+        self._full_snapshot: Optional[Dict] = None
+        self._full_snapshot_key: tuple = (None, None)
+        self._revalidation: Optional[asyncio.Future] = None
+        
+        # Koşullu istek / içerik hash'i: değişmeyen sayfa tekrar parse edilmez
+        self._page_etag: Optional[str] = None
+        self._page_last_modified: Optional[str] = None
+        self._page_hash: Optional[str] = None
+        self._parsed_page: Optional[Dict] = None
+        self._parse_stats = {"performed": 0, "skipped_not_modified": 0, "skipped_same_hash": 0}
+    
+    async def start(self):
+        """Paylaşılan HTTP oturumunu açar (keep-alive + DNS cache)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=POOL_LIMIT,
+                limit_per_host=POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers
+            )
+        return self._session
+    
+    async def close(self):
+        """Paylaşılan HTTP oturumunu kapatır"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Açık oturumu döndürür, yoksa açar"""
+        if self._session is None or self._session.closed:
+            return await self.start()
+        return self._session
     
     async def fetch_from_api(self) -> Optional[Dict]:
         """Doğrudan API'den veri çeker - EN HIZLI YOL"""
+        if not self.api_breaker.allow_request():
+            return None
+        # Devre sadece birincil kaynağın kendi sonucuna göre işler; yedeğin
+        # yanıtı ölü bir birincili gizlemez. None: sonuç yok (iptal / hedge)
+        primary_ok: Optional[bool] = None
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.api_url, headers=self.headers, timeout=5) as response:
-                    if response.status == 200:
-                        text = await response.text()
-                        import json
-                        data = json.loads(text)
-                        return self._transform_api_data(data)
+            session = await self._get_session()
+            result = await self.sources.fetch_hedged(session, timeout=API_TIMEOUT)
+            if not result:
+                primary_ok = False
+                return None
+            primary_ok = result.primary_ok
+            if not result.secondary:
+                return self._transform_api_data(result.raw, source=result.source.label)
+            primary = self.sources.sources[0]
+            return self._transform_api_data(
+                result.raw, source=primary.label,
+                secondary=result.secondary, secondary_source=result.source.label
+            )
         except Exception as e:
             print(f"API hatası: {e}")
-            self._api_available = False
-        return None
+            primary_ok = False
+            return None
+        finally:
+            if primary_ok is True:
+                self.api_breaker.record_success()
+            elif primary_ok is False:
+                self.api_breaker.record_failure()
+            else:
+                # half_open denemesi sonuçsuz bitti - bir sonraki tick tekrar dener
+                self.api_breaker.release_probe()
     
-    def _transform_api_data(self, raw_data: Dict) -> Dict:
-        """API verisini standart formata dönüştürür"""
+    def is_api_available(self) -> bool:
+        """Devre açık değilse doğrudan API yolu kullanılıyor demektir"""
+        return self.api_breaker.state != OPEN
+    
+    def _transform_api_data(
+        self,
+        raw_data: Dict,
+        source: str = "anlikaltinfiyatlari.com (Direct API)",
+        secondary: Iterable[str] = (),
+        secondary_source: Optional[str] = None
+    ) -> Dict:
+        """
+        API verisini standart formata dönüştürür.
+        secondary: yedek kaynaktan (secondary_source) gelen anahtarlar - bu
+        sembollerin kaydına 'source' alanı eklenir
+        """
         
         # Gram altın hesapla (ONS * DOLAR / 31.1)
         xauusd = raw_data.get('XAUUSD', 0)
         usdtry = raw_data.get('USDTRY', 0)
         gram_altin = round(xauusd * usdtry / 31.1, 2) if xauusd and usdtry else 0
         
-        return {
+        data = {
             "timestamp": datetime.now().isoformat(),
-            "source": "anlikaltinfiyatlari.com (Direct API)",
+            "source": source,
             "api_time": raw_data.get('T', ''),
             "general": {
                 "dolar": {
@@ -112,22 +238,56 @@ class DolarScraperPro:
             },
             "raw_api_data": raw_data
         }
+        
+        secondary = set(secondary)
+        if secondary:
+            if secondary & {'XAUUSD', 'USDTRY'}:
+                secondary.add('GRAMTRY')
+            for symbol, currency in data["currencies"].items():
+                if symbol in secondary:
+                    currency["source"] = secondary_source
+        return data
     
     async def fetch_from_page(self) -> Dict:
         """Web sayfasından veri çeker (yedek yöntem)"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.page_url, headers=self.headers, timeout=10) as response:
-                    html = await response.text()
-                    
-            soup = BeautifulSoup(html, 'html.parser')
+            session = await self._get_session()
+            timeout = aiohttp.ClientTimeout(total=PAGE_TIMEOUT)
+            async with session.get(self.page_url, headers=self._conditional_headers(), timeout=timeout) as response:
+                if response.status == 304 and self._parsed_page is not None:
+                    # Sunucu "değişmedi" dedi - önceki veriyi kullan
+                    html = None
+                elif response.status != 200:
+                    # Hata sayfası parse edilmez; son başarılı banka verisi (stale) kullanılır
+                    print(f"Sayfa çekme hatası: HTTP {response.status}")
+                    return {"error": f"HTTP {response.status}", "timestamp": datetime.now().isoformat()}
+                else:
+                    html = await response.read()
+                    self._page_etag = response.headers.get('ETag')
+                    self._page_last_modified = response.headers.get('Last-Modified')
+            
+            if html is None:
+                self._parse_stats["skipped_not_modified"] += 1
+                parsed = self._parsed_page
+            else:
+                body_hash = hashlib.blake2b(html, digest_size=16).hexdigest()
+                if body_hash == self._page_hash and self._parsed_page is not None:
+                    # İçerik aynı - parse etmeye gerek yok
+                    self._parse_stats["skipped_same_hash"] += 1
+                    parsed = self._parsed_page
+                else:
+                    # Parse işlemi event loop'u bloklamasın diye worker thread'de
+                    parsed = await asyncio.to_thread(self._parse_page, html)
+                    self._parse_stats["performed"] += 1
+                    self._page_hash = body_hash
+                    self._parsed_page = parsed
             
             data = {
                 "timestamp": datetime.now().isoformat(),
                 "source": "anlikaltinfiyatlari.com (Web Scraping)",
-                "general": self._extract_general_rates(soup),
-                "banks": self._extract_bank_rates(soup),
-                "currencies": self._extract_currencies_from_page(soup)
+                "general": parsed["general"],
+                "banks": parsed["banks"],
+                "currencies": parsed["currencies"]
             }
             
             return data
@@ -136,141 +296,136 @@ class DolarScraperPro:
             print(f"Sayfa çekme hatası: {e}")
             return {"error": str(e), "timestamp": datetime.now().isoformat()}
     
-    def _extract_general_rates(self, soup: BeautifulSoup) -> Dict:
-        """Genel dolar kurlarını çıkarır"""
-        try:
-            table = soup.find('table', class_='Kur')
-            if not table:
-                return {}
-            
-            rows = table.find_all('tr')
-            result = {}
-            
-            for row in rows[1:]:  # Header'ı atla
-                cells = row.find_all('td')
-                if len(cells) < 5:
-                    continue
-                
-                title = cells[0].get_text(strip=True)
-                is_kapali = 'KAPALIÇARŞI' in title.upper()
-                
-                key = "kapali_carsi" if is_kapali else "serbest_piyasa"
-                result[key] = {
-                    "name": "Kapalı Çarşı Dolar" if is_kapali else "Serbest Piyasa Dolar",
-                    "buy": self._safe_float(cells[1].get_text(strip=True)),
-                    "sell": self._safe_float(cells[2].get_text(strip=True)),
-                    "change": cells[3].get_text(strip=True) if len(cells) > 3 else None,
-                    "change_percent": cells[4].get_text(strip=True) if len(cells) > 4 else None,
-                    "time": cells[5].get_text(strip=True) if len(cells) > 5 else None
-                }
-            
-            return result
-            
-        except Exception as e:
-            print(f"Genel kurlar hatası: {e}")
+    def _conditional_headers(self) -> Dict[str, str]:
+        """Önceki yanıtın ETag / Last-Modified bilgisiyle koşullu istek başlıkları"""
+        if self._parsed_page is None:
             return {}
+        headers = {}
+        if self._page_etag:
+            headers['If-None-Match'] = self._page_etag
+        if self._page_last_modified:
+            headers['If-Modified-Since'] = self._page_last_modified
+        return headers
     
-    def _extract_bank_rates(self, soup: BeautifulSoup) -> List[Dict]:
-        """Banka kurlarını çıkarır"""
-        try:
-            bank_table = soup.find('table', id='banks')
-            if not bank_table:
-                return []
-            
-            rows = bank_table.find_all('tr')[1:]  # Header'ı atla
-            banks = []
-            
-            for row in rows:
-                cells = row.find_all('td')
-                if len(cells) < 5:
-                    continue
-                
-                bank_name_elem = cells[0].find('a')
-                bank_name = bank_name_elem.get_text(strip=True) if bank_name_elem else cells[0].get_text(strip=True)
-                
-                # data attribute'larından al
-                bank = {
-                    "name": bank_name.replace('Merkez Bankası', 'TCMB'),
-                    "code": row.get('data-bankcode', ''),
-                    "buy": self._safe_float(row.get('data-alis', cells[1].get_text(strip=True))),
-                    "sell": self._safe_float(row.get('data-satis', cells[2].get_text(strip=True))),
-                    "margin": f"%{row.get('data-oran', '')}" if row.get('data-oran') else cells[3].get_text(strip=True),
-                    "spread": self._safe_float(cells[4].get_text(strip=True)) if len(cells) > 4 else None
-                }
-                
-                # Saat bilgisi
-                time_elem = cells[0].find('span', class_='time')
-                if time_elem:
-                    bank['time'] = time_elem.get_text(strip=True)
-                
-                banks.append(bank)
-            
-            return banks
-            
-        except Exception as e:
-            print(f"Banka kurları hatası: {e}")
-            return []
+    def get_parse_stats(self) -> Dict[str, int]:
+        """Yapılan ve atlanan sayfa parse sayıları"""
+        return dict(self._parse_stats)
     
-    def _extract_currencies_from_page(self, soup: BeautifulSoup) -> Dict:
-        """Sayfadan diğer döviz kurlarını çıkarır"""
-        try:
-            currencies = {}
-            price_divs = soup.find_all('div', class_='price')
+    def _parse_page(self, html: bytes) -> Dict:
+        """Seçili parser ile ayrıştırır, hata olursa BeautifulSoup'a düşer"""
+        if self.parser.name != self._fallback_parser.name:
+            try:
+                return self.parser.parse(html)
+            except Exception as e:
+                print(f"{self.parser.name} parser hatası, BeautifulSoup'a geçiliyor: {e}")
+        return self._fallback_parser.parse(html)
+    
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Aynı anahtar için devam eden bir çağrı varsa onu bekler,
+        yoksa yeni bir çağrı başlatır. Sonuç tüm bekleyenlerle paylaşılır.
+        """
+        stats = self._flight_stats.setdefault(key, {"flights": 0, "coalesced": 0})
+        task = self._inflight.get(key)
+        if task is None:
+            stats["flights"] += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
             
-            for div in price_divs:
-                name_attr = div.get('data-name')
-                if name_attr:
-                    currencies[name_attr] = {
-                        "value": self._safe_float(div.get_text(strip=True))
-                    }
+            def _release(done: asyncio.Future):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
             
-            return currencies
-        except:
-            return {}
+            task.add_done_callback(_release)
+        else:
+            stats["coalesced"] += 1
+        
+        # shield: bir çağıranın iptali diğerlerinin beklediği isteği iptal etmesin
+        return await asyncio.shield(task)
     
-    def _safe_float(self, text) -> Optional[float]:
-        """Güvenli float dönüşümü"""
-        if text is None:
-            return None
-        try:
-            cleaned = str(text).replace(',', '').replace('%', '').strip()
-            return float(cleaned) if cleaned else None
-        except:
-            return None
+    def get_single_flight_stats(self) -> Dict[str, Dict[str, int]]:
+        """Her fetch türü için upstream çağrı ve birleştirilen çağıran sayıları"""
+        return {key: dict(stats) for key, stats in self._flight_stats.items()}
     
     async def fetch_all_data(self) -> Dict:
         """
         Tüm verileri çeker - Önce API, sonra sayfa
         API daha hızlı ve güvenilir!
         """
-        # Önce hızlı API'yi dene
-        if self._api_available:
-            api_data = await self.fetch_from_api()
-            if api_data:
-                # Banka verileri için sayfayı da çek
-                page_data = await self.fetch_from_page()
-                api_data['banks'] = page_data.get('banks', [])
-                api_data['general'].update(page_data.get('general', {}))
-                
-                self._cache = api_data
-                self._last_update = datetime.now()
-                return api_data
+        if self.mirror:
+            return self.get_full_snapshot() or self._no_data()
+        return await self._single_flight("all", self._fetch_all_data)
+    
+    async def _fetch_all_data(self) -> Dict:
+        # API ve sayfa aynı anda çekilir, toplam süre en yavaş olanınki kadar.
+        # Devre açıksa fetch_from_api() beklemeden None döner.
+        api_data, page_data = await asyncio.gather(
+            self.fetch_from_api(),
+            self.fetch_from_page()
+        )
+        if api_data:
+            self._merge_page_data(api_data, page_data)
+            
+            self._set_cache(api_data)
+            return api_data
         
-        # API başarısız olursa sayfadan çek
-        page_data = await self.fetch_from_page()
-        self._cache = page_data
-        self._last_update = datetime.now()
+        # API başarısız olursa sayfa verisini kullan
+        if 'error' not in page_data:
+            self._store_page(page_data)
+        self._set_cache(page_data)
         return page_data
     
+    def _merge_page_data(self, api_data: Dict, page_data: Dict):
+        """
+        Sayfa verisini API verisinin üzerine ekler.
+        Sayfa çekilemediyse son başarılı banka verisi 'stale' olarak kullanılır.
+        """
+        if 'error' not in page_data:
+            self._store_page(page_data)
+            api_data['banks'] = page_data.get('banks', [])
+            api_data['banks_stale'] = False
+        else:
+            previous = self._page_cache or {}
+            api_data['banks'] = previous.get('banks', [])
+            api_data['banks_stale'] = True
+            api_data['banks_error'] = page_data['error']
+            page_data = previous
+        
+        api_data['banks_timestamp'] = page_data.get('timestamp')
+        api_data['general'].update(page_data.get('general', {}))
+    
+    def _set_cache(self, data: Dict):
+        self._cache = data
+        self._last_update = datetime.now()
+        if self.store is not None and self.store.writer:
+            self.store.write(self.export_state(page=True))
+    
+    def _sync_store(self):
+        """Okuyucu depo: sürüm değiştiyse en son durumu uygular (değişmediyse sadece 8 byte okunur)"""
+        if self.store is None or self.store.writer:
+            return
+        state = self.store.read()
+        if state is not None and state is not self._store_state:
+            self._store_state = state
+            self.import_state(state)
+    
+    def _store_page(self, page_data: Dict):
+        self._page_cache = page_data
+        self._page_update = datetime.now()
+    
     async def fetch_quick(self) -> Dict:
         """
         Sadece API'den hızlı veri çeker (banka verileri olmadan)
         SÜPER HIZLI - milisaniyeler içinde yanıt
         """
+        if self.mirror:
+            return self.get_cached_data() or self._no_data()
+        return await self._single_flight("quick", self._fetch_quick)
+    
+    async def _fetch_quick(self) -> Dict:
         api_data = await self.fetch_from_api()
         if api_data:
-            self._cache = api_data
-            self._last_update = datetime.now()
+            self._set_cache(api_data)
             return api_data
         
         # Cache varsa döndür
@@ -280,11 +435,78 @@ class DolarScraperPro:
         # Son çare: sayfadan çek
         return await self.fetch_from_page()
     
+    @staticmethod
+    def _no_data() -> Dict:
+        return {"error": "Veri henüz alınmadı (ingest süreci bekleniyor)", "timestamp": datetime.now().isoformat()}
+    
+    def export_state(self, page: bool = False) -> Dict:
+        """Worker'lara yayınlanacak durum (page=True ise banka sayfası verisi de)"""
+        state = {
+            "cache": self._cache,
+            "last_update": self._last_update.isoformat() if self._last_update else None
+        }
+        if page:
+            state["page"] = self._page_cache
+            state["page_update"] = self._page_update.isoformat() if self._page_update else None
+        return state
+    
+    def import_state(self, state: Dict):
+        """export_state() çıktısını uygular (mirror modunda veriyolundan)"""
+        if "cache" in state:
+            self._cache = state["cache"]
+            self._last_update = datetime.fromisoformat(state["last_update"]) if state.get("last_update") else None
+        if "page" in state:
+            self._page_cache = state["page"]
+            self._page_update = datetime.fromisoformat(state["page_update"]) if state.get("page_update") else None
+    
     def get_cached_data(self) -> Optional[Dict]:
+        self._sync_store()
         return self._cache
     
     def get_last_update_time(self) -> Optional[datetime]:
+        self._sync_store()
         return self._last_update
+    
+    def get_page_update_time(self) -> Optional[datetime]:
+        """Banka verisinin en son başarıyla çekildiği zaman"""
+        self._sync_store()
+        return self._page_update
+    
+    def get_full_snapshot(self) -> Optional[Dict]:
+        """
+        Banka dahil en güncel snapshot - upstream'e gitmez.
+        Hızlı (1 sn) snapshot'ta banka yoksa son sayfa verisi eklenir.
+        Aynı girdiler için aynı dict döner (önceden kodlanmış yanıtlar tekrar kullanılır).
+        """
+        self._sync_store()
+        cache, page = self._cache, self._page_cache
+        if cache is None or page is None or 'banks' in cache:
+            return cache
+        
+        if self._full_snapshot_key[0] is not cache or self._full_snapshot_key[1] is not page:
+            full = dict(cache)
+            full['general'] = {**cache.get('general', {}), **page.get('general', {})}
+            full['banks'] = page.get('banks', [])
+            full['banks_stale'] = False
+            full['banks_timestamp'] = page.get('timestamp')
+            self._full_snapshot = full
+            self._full_snapshot_key = (cache, page)
+        return self._full_snapshot
+    
+    def revalidate_in_background(self) -> bool:
+        """Arka planda tek bir tam yenileme başlatır; zaten sürüyorsa (veya mirror ise) False"""
+        if self.mirror:
+            return False
+        if self._revalidation is not None and not self._revalidation.done():
+            return False
+        self._revalidation = asyncio.ensure_future(self.fetch_all_data())
+        self._revalidation.add_done_callback(self._revalidation_done)
+        return True
+    
+    @staticmethod
+    def _revalidation_done(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Arka plan yenileme hatası: {task.exception()}")
 
 
 # Test
@@ -325,6 +547,8 @@ async def test():
         print(f"\n🏦 {len(full_data['banks'])} Banka Kuru:")
         for bank in full_data['banks'][:3]:
             print(f"   {bank['name']}: Alış={bank['buy']} Satış={bank['sell']}")
+    
+    await scraper.close()
 
 if __name__ == "__main__":
     asyncio.run(test())
@@ -0,0 +1,67 @@
+"""
+Server-Sent Events bağlantısı - WebSocket'lerle aynı yayıncıyı paylaşır
+ConnectionManager'a WebSocket gibi görünür (accept / send_text / close);
+tick'ler aynı gönderici task'ından, tick başına bir kez kodlanmış 'sse'
+frame'i olarak gelir. Tampon tek frame'dir: istemci yavaşsa gönderici
+bekler ve ara tick'ler WebSocket'teki gibi atlanır. Keepalive yorum
+satırları da ConnectionManager'ın ortak heartbeat çarkından gelir.
+"""
+from collections import deque
+from typing import AsyncIterator, Deque, Optional
+import asyncio
+
+# Bu sürede veri yoksa bağlantıyı canlı tutmak için yorum satırı gönderilir
+# (ConnectionManager.connect'e ping_interval olarak verilir)
+KEEPALIVE_INTERVAL = 15.0
+
+# EventSource'un bağlantı koparsa yeniden denemeden önce beklediği süre (ms)
+RETRY_MS = 3000
+
+
+class SSEConnection:
+    """Tek bir SSE istemcisi için WebSocket benzeri gönderme ucu"""
+
+    def __init__(self):
+        self.frames: Deque[str] = deque()
+        # None: sınırsız (bağlantı başındaki greeting / replay için)
+        self.max_pending: Optional[int] = None
+        self.closed = False
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+
+    async def accept(self, subprotocol: Optional[str] = None):
+        pass
+
+    def limit(self, max_pending: int = 1):
+        """Greeting sonrası tamponu sınırlar - gönderici istemci hızına iner"""
+        self.max_pending = max_pending
+
+    async def send_text(self, text: str):
+        while self.max_pending is not None and len(self.frames) >= self.max_pending:
+            self._writable.clear()
+            await self._writable.wait()
+        if self.closed:
+            raise ConnectionError("SSE bağlantısı kapandı")
+        self.frames.append(text)
+        self._readable.set()
+
+    async def send_bytes(self, data: bytes):
+        await self.send_text(data.decode("utf-8"))
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+        self._readable.set()
+        self._writable.set()
+
+    async def stream(self) -> AsyncIterator[str]:
+        """StreamingResponse gövdesi"""
+        yield f"retry: {RETRY_MS}\n\n"
+        while not self.closed:
+            if not self.frames:
+                self._readable.clear()
+                await self._readable.wait()
+                if not self.frames:
+                    continue
+            frame = self.frames.popleft()
+            self._writable.set()
+            yield frame
@@ -0,0 +1,198 @@
+"""
+Yerel sahte upstream - Kayıt/tekrar oynatma
+anlikaltinfiyatlari.com ve TCMB'nin yerine geçer; benchmark ve yük testleri
+gerçek siteye dokunmadan çalışır.
+
+Kullanım:
+    # fixtures/ altındaki kayıtları sun
+    python fake_upstream.py serve --port 9000 --latency 50 --jitter 20 --error-rate 0.01 --walk 0.0005
+
+    # Gerçek yanıtları fixtures/ altına kaydet
+    python fake_upstream.py record
+
+    # API'yi sahte upstream'e yönlendir
+    UPSTREAM_BASE_URL=http://127.0.0.1:9000 TCMB_URL=http://127.0.0.1:9000/kurlar/today.xml python api_v2.py
+"""
+from aiohttp import web
+from pathlib import Path
+from typing import Dict, Optional
+import aiohttp
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+API_PATH = "/socket/total.php"
+PAGE_PATH = "/doviz/dolar"
+TCMB_PATH = "/kurlar/today.xml"
+
+# Kayıt modu: fixture dosyası → gerçek URL
+RECORD_TARGETS = {
+    "total.json": "https://anlikaltinfiyatlari.com" + API_PATH,
+    "dolar.html": "https://anlikaltinfiyatlari.com" + PAGE_PATH,
+    "today.xml": "https://www.tcmb.gov.tr" + TCMB_PATH
+}
+
+
+class FakeUpstreamConfig:
+    """Sahte upstream davranış ayarları"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0.0,
+        walk: float = 0.0,
+        seed: Optional[int] = None,
+        fixtures_dir: Path = FIXTURES_DIR
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.walk = walk
+        self.seed = seed
+        self.fixtures_dir = Path(fixtures_dir)
+
+
+class FakeUpstream:
+    """Kayıtlı yanıtları gecikme, hata ve fiyat random-walk ile sunar"""
+
+    def __init__(self, config: FakeUpstreamConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.prices: Dict = json.loads((config.fixtures_dir / "total.json").read_bytes())
+        self.page = (config.fixtures_dir / "dolar.html").read_bytes()
+        self.page_etag = '"' + hashlib.md5(self.page).hexdigest() + '"'
+        self.tcmb = (config.fixtures_dir / "today.xml").read_bytes()
+        self.requests: Dict[str, int] = {API_PATH: 0, PAGE_PATH: 0, TCMB_PATH: 0}
+
+    async def _delay(self):
+        delay = self.config.latency_ms + self.random.uniform(-1, 1) * self.config.jitter_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    def _should_fail(self) -> bool:
+        return self.random.random() < self.config.error_rate
+
+    def _step_prices(self):
+        """Her sayısal fiyatı küçük bir rastgele adım kadar oynatır"""
+        if not self.config.walk:
+            return
+        for key, value in self.prices.items():
+            if isinstance(value, (int, float)):
+                self.prices[key] = round(value * (1 + self.random.gauss(0, self.config.walk)), 4)
+        self.prices["T"] = time.strftime("%H:%M:%S")
+
+    async def total(self, request: web.Request) -> web.Response:
+        self.requests[API_PATH] += 1
+        await self._delay()
+        if self._should_fail():
+            return web.Response(status=503, text="Service Unavailable")
+        self._step_prices()
+        return web.Response(body=json.dumps(self.prices).encode(), content_type="application/json")
+
+    async def page_handler(self, request: web.Request) -> web.Response:
+        self.requests[PAGE_PATH] += 1
+        await self._delay()
+        if self._should_fail():
+            return web.Response(status=503, text="Service Unavailable")
+        if request.headers.get("If-None-Match") == self.page_etag:
+            return web.Response(status=304)
+        return web.Response(body=self.page, content_type="text/html", charset="utf-8",
+                            headers={"ETag": self.page_etag})
+
+    async def tcmb_handler(self, request: web.Request) -> web.Response:
+        self.requests[TCMB_PATH] += 1
+        await self._delay()
+        if self._should_fail():
+            return web.Response(status=503, text="Service Unavailable")
+        return web.Response(body=self.tcmb, content_type="application/xml")
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"requests": self.requests})
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(API_PATH, self.total)
+        app.router.add_get(PAGE_PATH, self.page_handler)
+        app.router.add_get(TCMB_PATH, self.tcmb_handler)
+        app.router.add_get("/_stats", self.stats)
+        return app
+
+
+async def start_fake_upstream(config: FakeUpstreamConfig, host: str = "127.0.0.1", port: int = 0):
+    """
+    Sahte upstream'i mevcut event loop'ta başlatır.
+    (runner, base_url, upstream) döndürür; durdurmak için runner.cleanup()
+    """
+    upstream = FakeUpstream(config)
+    runner = web.AppRunner(upstream.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}", upstream
+
+
+async def record(fixtures_dir: Path = FIXTURES_DIR):
+    """Gerçek upstream yanıtlarını fixture dosyalarına kaydeder"""
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Referer': 'https://anlikaltinfiyatlari.com/doviz/dolar'
+    }
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    async with aiohttp.ClientSession(headers=headers) as session:
+        for filename, url in RECORD_TARGETS.items():
+            try:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as response:
+                    body = await response.read()
+                if response.status != 200:
+                    print(f"❌ {url}: HTTP {response.status}")
+                    continue
+                (fixtures_dir / filename).write_bytes(body)
+                print(f"💾 {filename} ({len(body) / 1024:.1f} KB) ← {url}")
+            except Exception as e:
+                print(f"❌ {url}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel sahte upstream")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="Kayıtlı yanıtları sun")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=9000)
+    serve.add_argument("--latency", type=float, default=0, help="Ortalama gecikme (ms)")
+    serve.add_argument("--jitter", type=float, default=0, help="± gecikme sapması (ms)")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="503 döndürme olasılığı (0-1)")
+    serve.add_argument("--walk", type=float, default=0.0, help="İstek başına fiyat adımı std sapması (göreli)")
+    serve.add_argument("--seed", type=int, default=None)
+    serve.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+
+    rec = sub.add_parser("record", help="Gerçek yanıtları fixtures/ altına kaydet")
+    rec.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record(args.fixtures))
+        return
+
+    config = FakeUpstreamConfig(
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        error_rate=args.error_rate,
+        walk=args.walk,
+        seed=args.seed,
+        fixtures_dir=args.fixtures
+    )
+    print(f"🧪 Sahte upstream: http://{args.host}:{args.port}")
+    web.run_app(FakeUpstream(config).create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Timer wheel - çok sayıda bağlantı için ortak zamanlayıcı
+Bağlantı başına asyncio timer'ı (wait_for) yerine tek bir çark: her
+anahtar, süresinin dolacağı dilime konur; çark zamanlayıcıdan her
+çağrıldığında geçen süre kadar dilim ilerler ve süresi dolanları döndürür.
+schedule / cancel O(1), ilerleme sadece dolan dilimler kadar iş yapar.
+"""
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+import math
+import time
+
+# Dilim çözünürlüğü (saniye) ve dilim sayısı - 64 sn'ye kadar tek turda
+WHEEL_RESOLUTION = 1.0
+WHEEL_SLOTS = 64
+
+
+class TimerWheel:
+    """Hashed timer wheel (tur sayacı ile, dilim sayısından uzun süreler de olur)"""
+
+    def __init__(self, resolution: float = WHEEL_RESOLUTION, slots: int = WHEEL_SLOTS):
+        self.resolution = resolution
+        self.slots: List[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        # anahtar → bulunduğu dilim
+        self._where: Dict[Hashable, int] = {}
+        self._cursor = 0
+        self._last_advance = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def schedule(self, key: Hashable, delay: float):
+        """key'i delay saniye sonra dolacak şekilde (yeniden) yerleştirir"""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.resolution))
+        rounds, offset = divmod(ticks - 1, len(self.slots))
+        index = (self._cursor + 1 + offset) % len(self.slots)
+        self.slots[index][key] = rounds
+        self._where[key] = index
+
+    def cancel(self, key: Hashable):
+        index = self._where.pop(key, None)
+        if index is not None:
+            self.slots[index].pop(key, None)
+
+    def advance(self, now: Optional[float] = None) -> Set[Hashable]:
+        """Son çağrıdan bu yana geçen dilimleri işler, süresi dolan anahtarları döndürür"""
+        now = time.monotonic() if now is None else now
+        steps = int((now - self._last_advance) / self.resolution)
+        if steps <= 0:
+            return set()
+        self._last_advance += steps * self.resolution
+
+        expired: Set[Hashable] = set()
+        # Bir turdan fazla geride kalındıysa her dilim en fazla bir tur işlenir
+        for _ in range(min(steps, len(self.slots))):
+            self._cursor = (self._cursor + 1) % len(self.slots)
+            slot = self.slots[self._cursor]
+            due: List[Tuple[Hashable, int]] = list(slot.items())
+            for key, rounds in due:
+                if rounds > 0:
+                    slot[key] = rounds - 1
+                    continue
+                del slot[key]
+                del self._where[key]
+                expired.add(key)
+        return expired
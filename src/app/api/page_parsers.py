@@ -0,0 +1,272 @@
+"""
+Banka sayfası HTML parser'ları
+anlikaltinfiyatlari.com/doviz/dolar sayfasından genel kurları,
+banka kurlarını ve diğer döviz kurlarını çıkarır.
+
+İki backend vardır:
+1. lxml - C tabanlı, sadece table.Kur, table#banks ve div.price bölgelerini okur (HIZLI)
+2. BeautifulSoup (html.parser) - eski davranış, yedek olarak tutulur
+"""
+from bs4 import BeautifulSoup
+from typing import Dict, List, Optional
+
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+def safe_float(text) -> Optional[float]:
+    """Güvenli float dönüşümü"""
+    if text is None:
+        return None
+    try:
+        cleaned = str(text).replace(',', '').replace('%', '').strip()
+        return float(cleaned) if cleaned else None
+    except:
+        return None
+
+
+class SoupPageParser:
+    """Tüm sayfayı BeautifulSoup ile ağaca çevirir (yedek parser)"""
+
+    name = "soup"
+
+    def parse(self, html) -> Dict:
+        soup = BeautifulSoup(html, 'html.parser')
+        return {
+            "general": self._extract_general_rates(soup),
+            "banks": self._extract_bank_rates(soup),
+            "currencies": self._extract_currencies_from_page(soup)
+        }
+
+    def _extract_general_rates(self, soup: BeautifulSoup) -> Dict:
+        """Genel dolar kurlarını çıkarır"""
+        try:
+            table = soup.find('table', class_='Kur')
+            if not table:
+                return {}
+
+            rows = table.find_all('tr')
+            result = {}
+
+            for row in rows[1:]:  # Header'ı atla
+                cells = row.find_all('td')
+                if len(cells) < 5:
+                    continue
+
+                title = cells[0].get_text(strip=True)
+                is_kapali = 'KAPALIÇARŞI' in title.upper()
+
+                key = "kapali_carsi" if is_kapali else "serbest_piyasa"
+                result[key] = {
+                    "name": "Kapalı Çarşı Dolar" if is_kapali else "Serbest Piyasa Dolar",
+                    "buy": safe_float(cells[1].get_text(strip=True)),
+                    "sell": safe_float(cells[2].get_text(strip=True)),
+                    "change": cells[3].get_text(strip=True) if len(cells) > 3 else None,
+                    "change_percent": cells[4].get_text(strip=True) if len(cells) > 4 else None,
+                    "time": cells[5].get_text(strip=True) if len(cells) > 5 else None
+                }
+
+            return result
+
+        except Exception as e:
+            print(f"Genel kurlar hatası: {e}")
+            return {}
+
+    def _extract_bank_rates(self, soup: BeautifulSoup) -> List[Dict]:
+        """Banka kurlarını çıkarır"""
+        try:
+            bank_table = soup.find('table', id='banks')
+            if not bank_table:
+                return []
+
+            rows = bank_table.find_all('tr')[1:]  # Header'ı atla
+            banks = []
+
+            for row in rows:
+                cells = row.find_all('td')
+                if len(cells) < 5:
+                    continue
+
+                bank_name_elem = cells[0].find('a')
+                bank_name = bank_name_elem.get_text(strip=True) if bank_name_elem else cells[0].get_text(strip=True)
+
+                # data attribute'larından al
+                bank = {
+                    "name": bank_name.replace('Merkez Bankası', 'TCMB'),
+                    "code": row.get('data-bankcode', ''),
+                    "buy": safe_float(row.get('data-alis', cells[1].get_text(strip=True))),
+                    "sell": safe_float(row.get('data-satis', cells[2].get_text(strip=True))),
+                    "margin": f"%{row.get('data-oran', '')}" if row.get('data-oran') else cells[3].get_text(strip=True),
+                    "spread": safe_float(cells[4].get_text(strip=True)) if len(cells) > 4 else None
+                }
+
+                # Saat bilgisi
+                time_elem = cells[0].find('span', class_='time')
+                if time_elem:
+                    bank['time'] = time_elem.get_text(strip=True)
+
+                banks.append(bank)
+
+            return banks
+
+        except Exception as e:
+            print(f"Banka kurları hatası: {e}")
+            return []
+
+    def _extract_currencies_from_page(self, soup: BeautifulSoup) -> Dict:
+        """Sayfadan diğer döviz kurlarını çıkarır"""
+        try:
+            currencies = {}
+            price_divs = soup.find_all('div', class_='price')
+
+            for div in price_divs:
+                name_attr = div.get('data-name')
+                if name_attr:
+                    currencies[name_attr] = {
+                        "value": safe_float(div.get_text(strip=True))
+                    }
+
+            return currencies
+        except:
+            return {}
+
+
+def _has_class(name: str) -> str:
+    """BeautifulSoup'un class_ eşleşmesine denk XPath koşulu"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _text(element) -> str:
+    """get_text(strip=True) karşılığı"""
+    return ''.join(part.strip() for part in element.itertext())
+
+
+class LxmlPageParser:
+    """
+    lxml (libxml2) ile ayrıştırır ve sadece ilgili bölgeleri XPath ile okur.
+    Çıktısı SoupPageParser ile birebir aynıdır.
+    """
+
+    name = "lxml"
+
+    KUR_TABLE = f"//table[{_has_class('Kur')}]"
+    BANKS_TABLE = "//table[@id='banks']"
+    PRICE_DIVS = f"//div[{_has_class('price')}]"
+    TIME_SPAN = f".//span[{_has_class('time')}]"
+
+    def parse(self, html) -> Dict:
+        doc = lxml.html.fromstring(html)
+        return {
+            "general": self._extract_general_rates(doc),
+            "banks": self._extract_bank_rates(doc),
+            "currencies": self._extract_currencies_from_page(doc)
+        }
+
+    def _extract_general_rates(self, doc) -> Dict:
+        """Genel dolar kurlarını çıkarır"""
+        try:
+            tables = doc.xpath(self.KUR_TABLE)
+            if not tables:
+                return {}
+
+            rows = tables[0].xpath('.//tr')
+            result = {}
+
+            for row in rows[1:]:  # Header'ı atla
+                cells = [_text(cell) for cell in row.xpath('.//td')]
+                if len(cells) < 5:
+                    continue
+
+                is_kapali = 'KAPALIÇARŞI' in cells[0].upper()
+
+                key = "kapali_carsi" if is_kapali else "serbest_piyasa"
+                result[key] = {
+                    "name": "Kapalı Çarşı Dolar" if is_kapali else "Serbest Piyasa Dolar",
+                    "buy": safe_float(cells[1]),
+                    "sell": safe_float(cells[2]),
+                    "change": cells[3],
+                    "change_percent": cells[4],
+                    "time": cells[5] if len(cells) > 5 else None
+                }
+
+            return result
+
+        except Exception as e:
+            print(f"Genel kurlar hatası: {e}")
+            return {}
+
+    def _extract_bank_rates(self, doc) -> List[Dict]:
+        """Banka kurlarını çıkarır"""
+        try:
+            tables = doc.xpath(self.BANKS_TABLE)
+            if not tables:
+                return []
+
+            rows = tables[0].xpath('.//tr')[1:]  # Header'ı atla
+            banks = []
+
+            for row in rows:
+                cells = row.xpath('.//td')
+                if len(cells) < 5:
+                    continue
+
+                bank_name_elem = cells[0].find('.//a')
+                bank_name = _text(bank_name_elem) if bank_name_elem is not None else _text(cells[0])
+
+                bank = {
+                    "name": bank_name.replace('Merkez Bankası', 'TCMB'),
+                    "code": row.get('data-bankcode', ''),
+                    "buy": safe_float(row.get('data-alis', _text(cells[1]))),
+                    "sell": safe_float(row.get('data-satis', _text(cells[2]))),
+                    "margin": f"%{row.get('data-oran', '')}" if row.get('data-oran') else _text(cells[3]),
+                    "spread": safe_float(_text(cells[4]))
+                }
+
+                time_elems = cells[0].xpath(self.TIME_SPAN)
+                if time_elems:
+                    bank['time'] = _text(time_elems[0])
+
+                banks.append(bank)
+
+            return banks
+
+        except Exception as e:
+            print(f"Banka kurları hatası: {e}")
+            return []
+
+    def _extract_currencies_from_page(self, doc) -> Dict:
+        """Sayfadan diğer döviz kurlarını çıkarır"""
+        try:
+            currencies = {}
+            for div in doc.xpath(self.PRICE_DIVS):
+                name_attr = div.get('data-name')
+                if name_attr:
+                    currencies[name_attr] = {
+                        "value": safe_float(_text(div))
+                    }
+
+            return currencies
+        except:
+            return {}
+
+
+PARSERS = {
+    SoupPageParser.name: SoupPageParser,
+}
+if LXML_AVAILABLE:
+    PARSERS[LxmlPageParser.name] = LxmlPageParser
+
+
+def get_parser(name: str = "auto"):
+    """
+    İsme göre parser döndürür.
+    'auto' → lxml kuruluysa lxml, değilse BeautifulSoup
+    """
+    if name == "auto":
+        name = "lxml" if LXML_AVAILABLE else "soup"
+    if name not in PARSERS:
+        raise ValueError(f"Bilinmeyen parser: {name} (seçenekler: {', '.join(PARSERS)})")
+    return PARSERS[name]()
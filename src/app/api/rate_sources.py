@@ -0,0 +1,310 @@
+"""
+Kur kaynağı adaptörleri ve hedged istekler
+Her adaptör veriyi total.php anahtarlarıyla (USDTRY, EURTRY, ..., T) döndürür,
+böylece DolarScraperPro._transform_api_data hepsini aynı şekle dönüştürür.
+
+Birincil kaynak p95 gecikmesi içinde yanıt vermezse ikincil kaynağa da
+istek atılır. Birincilin tüm sembollerini kapsayan ilk geçerli yanıt
+kazanır, diğeri iptal edilir. Kapsamayan (ör. TCMB) yanıt sadece birincil
+başarısız olursa kullanılır; o da birincilin son başarılı ham verisinin
+üzerine, sadece kendi sembolleri için yazılır.
+"""
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Dict, FrozenSet, List, Optional, Tuple
+import xml.etree.ElementTree as ET
+import aiohttp
+import asyncio
+import json
+import math
+import time
+
+
+class RateSource(ABC):
+    """Kaynak adaptörü arayüzü"""
+
+    name = "base"
+    label = ""
+    # Yanıtta bulunan total.php anahtarları (T hariç)
+    symbols: Tuple[str, ...] = ()
+
+    @abstractmethod
+    async def fetch(self, session: aiohttp.ClientSession, timeout: float) -> Optional[Dict]:
+        """total.php formatında ham veri"""
+
+    @staticmethod
+    def is_valid(raw: Optional[Dict]) -> bool:
+        """En azından pozitif bir USDTRY değeri olmalı"""
+        if not raw:
+            return False
+        usdtry = raw.get('USDTRY')
+        return isinstance(usdtry, (int, float)) and usdtry > 0
+
+
+class DirectApiSource(RateSource):
+    """anlikaltinfiyatlari.com/socket/total.php - ana kaynak"""
+
+    name = "direct_api"
+    label = "anlikaltinfiyatlari.com (Direct API)"
+    symbols = ("USDTRY", "EURTRY", "GBPTRY", "EURUSD", "XAUUSD", "XAGUSD", "USDJPY", "USDCHF", "DXYUSD")
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def fetch(self, session: aiohttp.ClientSession, timeout: float) -> Optional[Dict]:
+        async with session.get(self.url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            # text() + json.loads yerine doğrudan byte'lardan çöz
+            return json.loads(await response.read())
+
+
+class TcmbSource(RateSource):
+    """
+    TCMB today.xml - günlük resmi kurlar (src/lib/exchangeRateService.ts ile aynı kaynak)
+    Günde bir değiştiği için yanıt cache_ttl süresince tekrar kullanılır.
+    """
+
+    name = "tcmb"
+    label = "TCMB (today.xml)"
+    symbols = ("USDTRY", "EURTRY", "GBPTRY", "EURUSD", "USDJPY", "USDCHF")
+
+    # total.php anahtarı → TCMB döviz kodu
+    CODES = ("USD", "EUR", "GBP", "JPY", "CHF")
+
+    def __init__(self, url: str = "https://www.tcmb.gov.tr/kurlar/today.xml", cache_ttl: float = 300):
+        self.url = url
+        self.cache_ttl = cache_ttl
+        self._cached: Optional[Dict] = None
+        self._cached_at = 0.0
+
+    async def fetch(self, session: aiohttp.ClientSession, timeout: float) -> Optional[Dict]:
+        if self._cached and time.monotonic() - self._cached_at < self.cache_ttl:
+            return self._cached
+
+        async with session.get(self.url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            body = await response.read()
+
+        raw = self.parse(body)
+        if self.is_valid(raw):
+            self._cached = raw
+            self._cached_at = time.monotonic()
+        return raw
+
+    @classmethod
+    def parse(cls, body: bytes) -> Dict:
+        """today.xml'i total.php formatına çevirir (alış/satış ortalaması, birim başına)"""
+        root = ET.fromstring(body)
+        rates = {}
+        for currency in root.iter('Currency'):
+            code = currency.get('Kod') or currency.get('CurrencyCode')
+            if code not in cls.CODES:
+                continue
+            try:
+                unit = float(currency.findtext('Unit') or 1)
+                buying = float(currency.findtext('ForexBuying'))
+                selling = float(currency.findtext('ForexSelling'))
+            except (TypeError, ValueError):
+                continue
+            rates[code] = (buying + selling) / 2 / unit
+
+        usdtry = rates.get("USD")
+        raw = {
+            "T": root.get('Tarih', ''),
+            "USDTRY": usdtry,
+            "EURTRY": rates.get("EUR"),
+            "GBPTRY": rates.get("GBP")
+        }
+        if usdtry:
+            if rates.get("EUR"):
+                raw["EURUSD"] = round(rates["EUR"] / usdtry, 4)
+            if rates.get("JPY"):
+                raw["USDJPY"] = round(usdtry / rates["JPY"], 4)
+            if rates.get("CHF"):
+                raw["USDCHF"] = round(usdtry / rates["CHF"], 4)
+        return {key: round(value, 4) if isinstance(value, float) else value
+                for key, value in raw.items() if value is not None}
+
+
+class SourceStats:
+    """Kaynak başına gecikme örnekleri ve sayaçlar"""
+
+    def __init__(self, sample_size: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=sample_size)
+        self.requests = 0
+        self.wins = 0
+        self.failures = 0
+        self.cancelled = 0
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(len(ordered) * 0.95) - 1)]
+
+    def snapshot(self) -> Dict:
+        p95 = self.p95()
+        return {
+            "requests": self.requests,
+            "wins": self.wins,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+
+class HedgedResult:
+    """
+    fetch_hedged sonucu.
+    primary_ok: birincilin kendi sonucu (True / False; başka kaynak
+    kazandığı için iptal edildiyse None) - circuit breaker sadece buna bakar.
+    secondary: ham veride birincilin son değerlerinin üzerine yazılan anahtarlar
+    """
+
+    def __init__(self, source: RateSource, raw: Dict, primary_ok: Optional[bool], secondary: FrozenSet[str] = frozenset()):
+        self.source = source
+        self.raw = raw
+        self.primary_ok = primary_ok
+        self.secondary = secondary
+
+
+class SourceRegistry:
+    """
+    Kayıt sırası öncelik sırasıdır: ilk kaynak birincil, sonrakiler hedge.
+    Hedge gecikmesi birincil kaynağın p95 gecikmesidir.
+    """
+
+    def __init__(self, default_hedge_delay: float = 0.5, min_hedge_delay: float = 0.05, min_samples: int = 20):
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.sources: List[RateSource] = []
+        self.stats: Dict[str, SourceStats] = {}
+        self.hedges_fired = 0
+        # Birincilin sembollerini kapsayan son ham veri (kısmi yedek bunun üzerine yazılır)
+        self._last_complete: Optional[Dict] = None
+
+    def register(self, source: RateSource):
+        self.sources.append(source)
+        self.stats[source.name] = SourceStats()
+
+    def get(self, name: str) -> Optional[RateSource]:
+        return next((source for source in self.sources if source.name == name), None)
+
+    def hedge_delay(self) -> float:
+        primary = self.stats[self.sources[0].name]
+        if len(primary.latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, primary.p95())
+
+    def is_complete(self, source: RateSource, raw: Dict) -> bool:
+        """Birincil kendi yanıtı ya da birincilin tüm sembollerini taşıyan yanıt"""
+        primary = self.sources[0]
+        if source is primary:
+            return True
+        return all(isinstance(raw.get(symbol), (int, float)) for symbol in primary.symbols)
+
+    def _merge_partial(self, raw: Dict) -> Tuple[Dict, FrozenSet[str]]:
+        """Kısmi yanıtı son tam verinin üzerine yazar; zaman (T) son tam veriden kalır"""
+        merged = dict(self._last_complete) if self._last_complete else {"T": ""}
+        secondary = frozenset(key for key in raw if key != "T")
+        for key in secondary:
+            merged[key] = raw[key]
+        return merged, secondary
+
+    async def _timed_fetch(self, source: RateSource, session: aiohttp.ClientSession, timeout: float) -> Optional[Dict]:
+        stats = self.stats[source.name]
+        stats.requests += 1
+        started = time.perf_counter()
+        try:
+            raw = await source.fetch(session, timeout)
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception as e:
+            stats.failures += 1
+            print(f"{source.name} kaynak hatası: {e}")
+            return None
+        stats.latencies.append(time.perf_counter() - started)
+        if not source.is_valid(raw):
+            stats.failures += 1
+            return None
+        return raw
+
+    async def fetch_hedged(self, session: aiohttp.ClientSession, timeout: float) -> Optional[HedgedResult]:
+        """
+        Birincil kaynağı başlatır; p95 süresinde bitmezse (veya geçersiz dönerse)
+        sıradaki kaynağı da başlatır. İlk geçerli tam yanıtı döndürür, kalanları
+        iptal eder. Kısmi yanıt ancak tam yanıt gelmezse (birincil hata / zaman
+        aşımı) son tam verinin üzerine yazılarak döner.
+        """
+        if not self.sources:
+            return None
+
+        primary = self.sources[0]
+        primary_ok: Optional[bool] = None
+        partial: Optional[Tuple[RateSource, Dict]] = None
+        pending: Dict[asyncio.Task, RateSource] = {}
+        queue = list(self.sources)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        def launch():
+            source = queue.pop(0)
+            pending[asyncio.ensure_future(self._timed_fetch(source, session, timeout))] = source
+
+        launch()
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                wait_for = min(self.hedge_delay(), remaining) if queue else remaining
+                done, _ = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Birincil yavaş - hedge isteği at
+                    if queue:
+                        self.hedges_fired += 1
+                        launch()
+                    continue
+
+                for task in done:
+                    source = pending.pop(task)
+                    raw = task.result()
+                    if source is primary:
+                        primary_ok = raw is not None
+                    if raw is None:
+                        continue
+                    if self.is_complete(source, raw):
+                        self.stats[source.name].wins += 1
+                        self._last_complete = raw
+                        return HedgedResult(source, raw, primary_ok)
+                    if partial is None:
+                        partial = (source, raw)
+
+                # Biten yanıtlar başarısız / kısmi - beklemeden sıradakini dene
+                if queue:
+                    launch()
+
+            # Tam yanıt yok: birincil hata verdi ya da süresi doldu
+            if partial is None:
+                return None
+            source, raw = partial
+            self.stats[source.name].wins += 1
+            merged, secondary = self._merge_partial(raw)
+            return HedgedResult(source, merged, False, secondary)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> Dict:
+        """/api/status için kaynak istatistikleri"""
+        return {
+            "order": [source.name for source in self.sources],
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1),
+            "hedges_fired": self.hedges_fired,
+            "sources": {name: stats.snapshot() for name, stats in self.stats.items()}
+        }
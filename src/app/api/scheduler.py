@@ -0,0 +1,160 @@
+"""
+Adaptif polling zamanlayıcı
+Sabit asyncio.sleep döngülerinin yerine geçer:
+- Tick'ler duvar saati sınırlarına hizalanır (kayma yok)
+- Her iş için ayrı aralıklar
+- Abone yoksa veya piyasa kapalıysa yavaşlar
+- Son tick'lerde oynaklık yüksekse hızlanır
+- Yavaş bir fetch aynı işin bir sonraki tick'i ile asla çakışmaz
+"""
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+import math
+import time
+
+# Türkiye 2016'dan beri sabit UTC+3 (yaz saati yok)
+ISTANBUL_TZ = timezone(timedelta(hours=3))
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """Döviz piyasası hafta içi açık, hafta sonu (İstanbul saatiyle) kapalı"""
+    now = now or datetime.now(ISTANBUL_TZ)
+    return now.astimezone(ISTANBUL_TZ).weekday() < 5
+
+
+class Job:
+    """Zamanlanmış tek bir iş ve istatistikleri"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        interval: float,
+        idle_interval: Optional[float] = None,
+        closed_interval: Optional[float] = None,
+        fast_interval: Optional[float] = None,
+        has_subscribers: Optional[Callable[[], bool]] = None,
+        volatility_price: Optional[Callable[[Any], Optional[float]]] = None,
+        volatility_threshold: float = 0.0005,
+        volatility_window: int = 10
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.idle_interval = idle_interval or interval
+        self.closed_interval = closed_interval or interval
+        self.fast_interval = fast_interval or interval
+        self.has_subscribers = has_subscribers
+        self.volatility_price = volatility_price
+        self.volatility_threshold = volatility_threshold
+
+        self._prices: Deque[float] = deque(maxlen=volatility_window)
+        self.runs = 0
+        self.errors = 0
+        self.skipped_ticks = 0
+        self.last_duration: Optional[float] = None
+        self.current_interval = interval
+        self.mode = "normal"
+
+    def volatility(self) -> float:
+        """Penceredeki en büyük ardışık göreli fiyat değişimi"""
+        prices = list(self._prices)
+        changes = [abs(b / a - 1) for a, b in zip(prices, prices[1:]) if a]
+        return max(changes, default=0.0)
+
+    def record_result(self, result: Any):
+        if self.volatility_price is None or result is None:
+            return
+        price = self.volatility_price(result)
+        if price:
+            self._prices.append(price)
+
+    def snapshot(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "interval": self.current_interval,
+            "runs": self.runs,
+            "errors": self.errors,
+            "skipped_ticks": self.skipped_ticks,
+            "last_duration_ms": round(self.last_duration * 1000, 1) if self.last_duration is not None else None,
+            "volatility": round(self.volatility(), 6)
+        }
+
+
+class PollingScheduler:
+    """İşleri kendi döngülerinde, duvar saatine hizalı olarak çalıştırır"""
+
+    def __init__(
+        self,
+        market_open: Callable[[], bool] = is_market_open,
+        clock: Callable[[], float] = time.time
+    ):
+        self.market_open = market_open
+        self._clock = clock
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[Any]], interval: float, **options) -> Job:
+        job = Job(name, func, interval, **options)
+        self.jobs[name] = job
+        return job
+
+    def start(self):
+        for name, job in self.jobs.items():
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.create_task(self._run(job))
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    def _choose_interval(self, job: Job) -> float:
+        """Sırası önemli: piyasa kapalı > abone yok > oynaklık > normal"""
+        if not self.market_open():
+            job.mode = "market_closed"
+            return job.closed_interval
+        if job.has_subscribers is not None and not job.has_subscribers():
+            job.mode = "idle"
+            return job.idle_interval
+        if job.volatility() >= job.volatility_threshold:
+            job.mode = "volatile"
+            return job.fast_interval
+        job.mode = "normal"
+        return job.interval
+
+    def _delay_to_boundary(self, interval: float) -> float:
+        """Bir sonraki interval katına (duvar saati) kalan süre"""
+        now = self._clock()
+        next_tick = (math.floor(now / interval) + 1) * interval
+        return next_tick - now
+
+    async def _run(self, job: Job):
+        while True:
+            interval = self._choose_interval(job)
+            job.current_interval = interval
+            await asyncio.sleep(self._delay_to_boundary(interval))
+
+            # İş bitmeden bir sonraki tick başlamaz; kaçırılan sınırlar atlanır
+            started = self._clock()
+            try:
+                result = await job.func()
+                job.record_result(result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.errors += 1
+                print(f"[{job.name}] zamanlanmış iş hatası: {e}")
+            job.runs += 1
+            job.last_duration = self._clock() - started
+            job.skipped_ticks += int(job.last_duration // interval)
+
+    def snapshot(self) -> Dict:
+        """/api/status için iş durumları"""
+        return {
+            "market_open": self.market_open(),
+            "jobs": {name: job.snapshot() for name, job in self.jobs.items()}
+        }
@@ -0,0 +1,199 @@
+"""
+Paylaşılan bellek snapshot deposu (mmap + seqlock)
+Ingest süreci her snapshot'ı serileştirip tek bir bellek eşlemeli dosyaya
+yazar; aynı makinedeki tüm worker süreçleri IPC olmadan en son byte'ları
+okur. Yazıcı tektir.
+
+Başlık (little-endian):  magic "DSNP" | layout (uint32) | seq (uint64) | uzunluk (uint32)
+    seq tek sayı → yazım sürüyor; okuyucu okuma öncesi ve sonrası seq'i
+    karşılaştırır, farklıysa (yırtık okuma) tekrar dener.
+
+Okuyucu payload'ı kopyalamaz, eşlemeden doğrudan çözer (sürüm başına bir
+kez). Aynı seq için veriyi tekrar çözmez; get_cached_data() aynı dict'i
+döndürür, böylece önceden kodlanmış HTTP yanıtları da tekrar kullanılır.
+"""
+from typing import Any, Optional, Tuple
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+
+from snapshot_responses import json_dumps, json_loads
+
+MAGIC = b"DSNP"
+LAYOUT_VERSION = 1
+HEADER = struct.Struct("<4sIQI")
+SEQ_OFFSET = 8
+HEADER_SIZE = 32
+
+# Banka verisi dahil snapshot ~10 KB; bol pay bırakılır
+DEFAULT_CAPACITY = 1 << 20
+
+# Yırtık okumada en fazla bu kadar tekrar denenir, sonra önceki değer kullanılır
+MAX_READ_RETRIES = 100
+
+
+def default_store_path() -> str:
+    path = os.environ.get("SNAPSHOT_STORE_PATH")
+    if path:
+        return path
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "dolar-api-snapshot")
+
+
+class SharedSnapshotStore:
+    """
+    writer=True: open() ile dosyayı kilitler, oluşturur ve yazar (ingest)
+    writer=False: salt okunur eşler (worker); dosya henüz yoksa ilk okumada tekrar dener
+    """
+
+    def __init__(self, path: Optional[str] = None, writer: bool = False, capacity: int = DEFAULT_CAPACITY):
+        self.path = path or default_store_path()
+        self.writer = writer
+        self.capacity = capacity
+        self._mm: Optional[mmap.mmap] = None
+        self._lock_fd: Optional[int] = None
+        self._seq = 0
+        self._value: Any = None
+
+        self.writes = 0
+        self.reads = 0
+        self.retries = 0
+
+    def open(self):
+        """
+        Yazıcı: dosyayı özel kilitler, sonra başlığı okur / yazar. Başka bir
+        yazıcı yaşıyorsa RuntimeError - başlığa ve seq'e dokunulmaz.
+        Kilit dosya tanımlayıcısı kapanınca (süreç ölünce de) kalkar.
+        """
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise RuntimeError(f"Snapshot deposuna zaten bir süreç yazıyor: {self.path}")
+        self._lock_fd = fd
+        os.ftruncate(fd, HEADER_SIZE + self.capacity)
+        self._mm = mmap.mmap(fd, HEADER_SIZE + self.capacity)
+        # Yeniden başlayan yazıcı sürümü sıfırlamaz, okuyucular kaldığı yerden devam eder
+        magic, layout, seq, _ = HEADER.unpack_from(self._mm, 0)
+        if magic == MAGIC and layout == LAYOUT_VERSION:
+            self._seq = seq + (seq & 1)
+            if seq & 1:
+                # Önceki yazıcı yazım ortasında ölmüş: yarım payload geçerli sayılmaz
+                struct.pack_into("<I", self._mm, SEQ_OFFSET + 8, 0)
+            struct.pack_into("<Q", self._mm, SEQ_OFFSET, self._seq)
+        else:
+            self._seq = 0
+            HEADER.pack_into(self._mm, 0, MAGIC, LAYOUT_VERSION, 0, 0)
+
+    def _open_reader(self) -> bool:
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            size = os.fstat(fd).st_size
+            if size < HEADER_SIZE:
+                return False
+            self._mm = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        magic, layout, _, _ = HEADER.unpack_from(self._mm, 0)
+        if magic == MAGIC and layout == LAYOUT_VERSION:
+            return True
+        self._mm.close()
+        self._mm = None
+        if magic == MAGIC:
+            raise ValueError(f"Snapshot deposu başka bir sürümde (layout {layout}): {self.path}")
+        # Yazıcı dosyayı oluşturmuş ama başlığı henüz yazmamış - sonra tekrar denenir
+        return False
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def write(self, value: Any):
+        """Değeri serileştirip yazar (seqlock: tek → yaz → çift)"""
+        payload = json_dumps(value)
+        if len(payload) > self.capacity:
+            raise ValueError(f"Snapshot ({len(payload)} byte) depo kapasitesini aşıyor ({self.capacity})")
+
+        mm = self._mm
+        struct.pack_into("<Q", mm, SEQ_OFFSET, self._seq + 1)
+        mm[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+        struct.pack_into("<I", mm, SEQ_OFFSET + 8, len(payload))
+        self._seq += 2
+        struct.pack_into("<Q", mm, SEQ_OFFSET, self._seq)
+        self._value = value
+        self.writes += 1
+
+    def version(self) -> int:
+        """Yazılan son sürüm (çift) - değişmediyse read() çözme yapmaz"""
+        if self._mm is None:
+            return 0
+        return struct.unpack_from("<Q", self._mm, SEQ_OFFSET)[0]
+
+    def _read_consistent(self) -> Optional[Tuple[int, Any]]:
+        """
+        Payload kopyalanmaz: eşlemenin memoryview'i doğrudan çözülür, seq
+        çözümden sonra kontrol edilir. Yırtık okumada çözüm hata verebilir
+        veya anlamsız bir nesne üretebilir; ikisi de atılıp tekrar denenir.
+        """
+        mm = self._mm
+        for _ in range(MAX_READ_RETRIES):
+            start = struct.unpack_from("<Q", mm, SEQ_OFFSET)[0]
+            if start & 1:
+                self.retries += 1
+                continue
+            length = struct.unpack_from("<I", mm, SEQ_OFFSET + 8)[0]
+            value, ok = None, HEADER_SIZE + length <= len(mm)
+            if ok and start and length:
+                try:
+                    with memoryview(mm) as view, view[HEADER_SIZE:HEADER_SIZE + length] as payload:
+                        value = json_loads(payload)
+                except ValueError:
+                    ok = False
+            if ok and struct.unpack_from("<Q", mm, SEQ_OFFSET)[0] == start:
+                return start, value
+            self.retries += 1
+        return None
+
+    def read(self) -> Any:
+        """
+        En son değer. Sürüm değişmediyse önceki (aynı) nesne döner;
+        tutarlı okuma yapılamazsa (yazıcı yazım ortasında) de önceki değer.
+        """
+        if self.writer:
+            return self._value
+        if self._mm is None and not self._open_reader():
+            return None
+
+        if self.version() == self._seq:
+            return self._value
+        result = self._read_consistent()
+        if result is None:
+            return self._value
+        seq, value = result
+        if value is not None:
+            self._value = value
+        self._seq = seq
+        self.reads += 1
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": "mmap",
+            "path": self.path,
+            "mode": "writer" if self.writer else "reader",
+            "version": self.version(),
+            "capacity": self.capacity,
+            "writes": self.writes,
+            "decodes": self.reads,
+            "torn_read_retries": self.retries
+        }
@@ -0,0 +1,208 @@
+"""
+Yerel snapshot veriyolu - tek ingest süreci, çok sayıda worker
+Upstream'i sadece ingest süreci çeker; her snapshot / delta Unix socket
+üzerinden worker'lara yayınlanır, her worker sadece kendi istemcilerine
+dağıtır. Çerçeve: 4 byte uzunluk (big-endian) + JSON.
+
+    ingest → worker:  {"kind": "page" | "quick", ...}
+    worker → ingest:  {"kind": "clients", "count": 12}
+
+Yeni bağlanan worker'a her türün son çerçevesi hemen gönderilir; geride
+kalan (yazma tamponu dolan) worker bağlantısı kesilir, yeniden bağlanınca
+son durumu alır.
+
+Yayıncı tektir: socket yolunun yanındaki '.lock' dosyası fcntl ile
+kilitlenir; ikinci bir ingest süreci (ör. --workers 2) başlamayı reddeder.
+"""
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import fcntl
+import os
+import struct
+
+from snapshot_responses import json_dumps, json_loads
+
+DEFAULT_BUS_PATH = "/tmp/dolar-api-bus.sock"
+
+FRAME_HEADER = struct.Struct("!I")
+
+# Bir worker'ın okunmamış verisi bu boyutu aşarsa bağlantısı kesilir
+MAX_BACKLOG = 1 << 20
+
+# Bağlantı koptuğunda yeniden deneme aralıkları (saniye)
+RECONNECT_MIN = 0.2
+RECONNECT_MAX = 5.0
+
+
+def bus_path() -> str:
+    return os.environ.get("SNAPSHOT_BUS_PATH") or DEFAULT_BUS_PATH
+
+
+def pack_frame(message: Dict) -> bytes:
+    body = json_dumps(message)
+    return FRAME_HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict:
+    header = await reader.readexactly(FRAME_HEADER.size)
+    (length,) = FRAME_HEADER.unpack(header)
+    return json_loads(await reader.readexactly(length))
+
+
+class BusPublisher:
+    """Ingest tarafı - çerçeveyi bir kez kodlar, tüm worker'lara yazar"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or bus_path()
+        self._server: Optional[asyncio.AbstractServer] = None
+        # worker bağlantısı → bildirdiği istemci sayısı
+        self._workers: Dict[asyncio.StreamWriter, int] = {}
+        # Tür başına son çerçeve (yeni worker'lar için, yayın sırasıyla)
+        self._latest: Dict[str, bytes] = {}
+        self._lock_fd: Optional[int] = None
+        self.published = 0
+        self.dropped = 0
+
+    def _acquire_lock(self):
+        """Aynı yolda başka bir yayıncı yaşıyorsa RuntimeError (kilit süreç ölünce kalkar)"""
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise RuntimeError(f"Veriyolunda zaten bir ingest süreci yayında: {self.path}")
+        self._lock_fd = fd
+
+    async def start(self):
+        self._acquire_lock()
+        # Kilit bizde: yoldaki socket ölmüş bir yayıncıdan kalmıştır
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self._workers):
+            writer.close()
+        self._workers.clear()
+        if self._lock_fd is None:
+            return
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        os.close(self._lock_fd)
+        self._lock_fd = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._workers[writer] = 0
+        for frame in self._latest.values():
+            writer.write(frame)
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message.get("kind") == "clients":
+                    self._workers[writer] = int(message.get("count") or 0)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._workers.pop(writer, None)
+            writer.close()
+
+    def publish(self, kind: str, message: Dict):
+        """Çerçeveyi bir kez kodlar, hiçbir worker'ı beklemeden yazar"""
+        frame = pack_frame({"kind": kind, **message})
+        self._latest.pop(kind, None)
+        self._latest[kind] = frame
+        self.published += 1
+        for writer in list(self._workers):
+            if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                self._workers.pop(writer, None)
+                writer.close()
+                self.dropped += 1
+                continue
+            writer.write(frame)
+
+    def remote_clients(self) -> int:
+        """Tüm worker'ların bildirdiği istemci sayısı toplamı"""
+        return sum(self._workers.values())
+
+    def snapshot(self) -> Dict:
+        return {
+            "role": "publisher",
+            "path": self.path,
+            "workers": len(self._workers),
+            "remote_clients": self.remote_clients(),
+            "published": self.published,
+            "dropped_workers": self.dropped
+        }
+
+
+class BusSubscriber:
+    """Worker tarafı - ingest'e bağlanır, gelen her çerçeveyi handler'a verir"""
+
+    def __init__(self, handler: Callable[[Dict], Awaitable[None]], path: Optional[str] = None):
+        self.path = path or bus_path()
+        self.handler = handler
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        delay = RECONNECT_MIN
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except (ConnectionError, FileNotFoundError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX)
+                continue
+
+            self._writer = writer
+            delay = RECONNECT_MIN
+            try:
+                while True:
+                    message = await read_frame(reader)
+                    self.received += 1
+                    try:
+                        await self.handler(message)
+                    except Exception as e:
+                        print(f"Veriyolu mesajı işlenemedi: {e}")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                print("⚠️ Veriyolu bağlantısı koptu, yeniden bağlanılıyor...")
+            finally:
+                self._writer = None
+                self.reconnects += 1
+                writer.close()
+
+    def report_clients(self, count: int):
+        """Ingest'in adaptif zamanlayıcısı için bu worker'daki istemci sayısı"""
+        if self._writer is not None:
+            self._writer.write(pack_frame({"kind": "clients", "count": count}))
+
+    def snapshot(self) -> Dict:
+        return {
+            "role": "subscriber",
+            "path": self.path,
+            "connected": self.connected,
+            "received": self.received,
+            "reconnects": self.reconnects
+        }
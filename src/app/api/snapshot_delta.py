@@ -0,0 +1,111 @@
+"""
+Snapshot farkları - WebSocket'e sadece değişen semboller / alanlar gider
+Her değişiklik artan bir sıra numarası (seq) taşır; hiçbir şey değişmediyse
+mesaj üretilmez. İstemci sıra atlarsa veya 'resync' isterse tam snapshot alır.
+
+    {"type": "delta", "seq": 42, "timestamp": "...", "api_time": "...",
+     "changes": {"currencies": {"USDTRY": {"value": 42.4331}}}}
+"""
+from typing import Dict, FrozenSet, Optional, Set
+
+# Karşılaştırılan bölümler - timestamp / api_time her tick değiştiği için fark sayılmaz
+DIFF_SECTIONS = ("currencies", "general")
+
+# Kayıt içindeki zaman alanları da fark sayılmaz; başka bir alan
+# değiştiğinde yeni değerleriyle birlikte gönderilir
+TIME_FIELDS = frozenset({"source_time"})
+
+
+def diff_section(previous: Dict, current: Dict) -> Dict:
+    """{anahtar: {alan: değer}} - sadece değişen alanlar; silinen anahtar → None"""
+    changes = {}
+    for key, item in current.items():
+        before = previous.get(key)
+        if before == item:
+            continue
+        if not isinstance(item, dict) or not isinstance(before, dict):
+            changes[key] = item
+            continue
+        fields = {field: value for field, value in item.items() if before.get(field) != value}
+        fields.update({field: None for field in before.keys() - item.keys()})
+        if fields.keys() - TIME_FIELDS:
+            changes[key] = fields
+    for key in previous.keys() - current.keys():
+        changes[key] = None
+    return changes
+
+
+def diff_snapshots(previous: Optional[Dict], current: Dict) -> Dict:
+    """İki snapshot arasındaki farklar (bölüm → değişiklikler)"""
+    previous = previous or {}
+    changes = {}
+    for section in DIFF_SECTIONS:
+        section_changes = diff_section(previous.get(section) or {}, current.get(section) or {})
+        if section_changes:
+            changes[section] = section_changes
+    return changes
+
+
+def changed_symbols(message: Dict) -> Set[str]:
+    """delta mesajında değişen semboller (abone yönlendirmesi için)"""
+    return set(message.get("changes", {}).get("currencies", {}))
+
+
+def filter_message(message: Dict, symbols: Optional[FrozenSet[str]]) -> Dict:
+    """
+    Mesajı abonenin sembolleriyle süzer (symbols None ise olduğu gibi).
+    Sembol bazlı olmayan 'general' ve 'raw_api_data' süzülmüş mesajlara girmez.
+    """
+    if symbols is None:
+        return message
+    if "changes" in message:
+        currencies = message["changes"].get("currencies", {})
+        changes = {"currencies": {symbol: currencies[symbol] for symbol in currencies if symbol in symbols}}
+        return {**message, "changes": changes}
+    if "data" in message and message["data"]:
+        data = {key: value for key, value in message["data"].items() if key not in ("general", "raw_api_data")}
+        currencies = message["data"].get("currencies", {})
+        data["currencies"] = {symbol: currencies[symbol] for symbol in currencies if symbol in symbols}
+        return {**message, "data": data}
+    return message
+
+
+class DeltaTracker:
+    """Son yayınlanan snapshot'ı ve sıra numarasını tutar"""
+
+    def __init__(self):
+        self.seq = 0
+        self.snapshot: Optional[Dict] = None
+        self.suppressed = 0
+
+    def update(self, snapshot: Dict) -> Optional[Dict]:
+        """Yeni snapshot için delta mesajı; değişiklik yoksa None"""
+        changes = diff_snapshots(self.snapshot, snapshot)
+        if not changes:
+            self.suppressed += 1
+            return None
+
+        self.seq += 1
+        self.snapshot = snapshot
+        return {
+            "type": "delta",
+            "seq": self.seq,
+            "timestamp": snapshot.get("timestamp"),
+            "api_time": snapshot.get("api_time"),
+            "changes": changes
+        }
+
+    def apply(self, snapshot: Dict, seq: int):
+        """Başka süreçte (ingest) hesaplanmış durumu uygular - diff yapılmaz"""
+        self.seq = seq
+        self.snapshot = snapshot
+
+    def full_message(self, message_type: str = "snapshot", fallback: Optional[Dict] = None) -> Optional[Dict]:
+        """Son yayınlanan tam snapshot (resync ve geride kalan istemciler için)"""
+        data = self.snapshot if self.snapshot is not None else fallback
+        if data is None:
+            return None
+        return {"type": message_type, "seq": self.seq, "data": data}
+
+    def stats(self) -> Dict:
+        return {"seq": self.seq, "suppressed_ticks": self.suppressed}
@@ -0,0 +1,185 @@
+"""
+Önceden serileştirilmiş, önceden sıkıştırılmış snapshot yanıtları
+Her yeni snapshot her uç nokta için TEK KEZ JSON'a çevrilir; gzip / brotli
+halleri de o anda hazırlanır. Sonraki istekler hazır byte'ları döndürür,
+If-None-Match eşleşirse encoder'a hiç dokunmadan 304 döner.
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple, Union
+from fastapi import Request
+from fastapi.responses import Response
+import gzip
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bu boyutun altındaki gövdeler sıkıştırılmaz (başlık yükü kazançtan büyük)
+MIN_COMPRESS_SIZE = 512
+
+
+def json_dumps(data: Any) -> bytes:
+    """Hızlı JSON kodlama (orjson varsa), yoksa standart json"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_loads(data: Union[bytes, memoryview]) -> Any:
+    """json_dumps'ın tersi (orjson memoryview'i kopyalamadan okur)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    """datetime → Last-Modified başlık formatı"""
+    if value is None:
+        return None
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match başlığında (zayıf veya liste halinde) etag var mı"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class EncodedPayload:
+    """Bir snapshot'ın hazır byte halleri ve cache başlıkları"""
+
+    def __init__(self, body: bytes, last_modified: Optional[datetime] = None, max_age: int = 1):
+        self.body = body
+        compress = len(body) >= MIN_COMPRESS_SIZE
+        self.gzip = gzip.compress(body, compresslevel=6) if compress else None
+        self.br = brotli.compress(body, quality=5) if compress and brotli is not None else None
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        self.last_modified = http_date(last_modified)
+        self.cache_control = f"public, max-age={max_age}"
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        return headers
+
+    def to_response(self, request: Request) -> Response:
+        headers = self.headers()
+        if etag_matches(request, self.etag):
+            return Response(status_code=304, headers=headers)
+
+        accept = request.headers.get("accept-encoding", "")
+        body = self.body
+        if self.br is not None and "br" in accept:
+            body = self.br
+            headers["Content-Encoding"] = "br"
+        elif self.gzip is not None and "gzip" in accept:
+            body = self.gzip
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+class SnapshotResponses:
+    """
+    Uç nokta adına (ve filtre anahtarına) göre hazır yanıtları tutar.
+    Kaynak snapshot nesnesi değişmedikçe (aynı dict) serileştirme tekrarlanmaz.
+    build() dict döndürürse kodlanır, bytes döndürürse olduğu gibi kullanılır.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.encodes = 0
+        self.hits = 0
+
+    def get(
+        self,
+        name: Hashable,
+        source: Any,
+        build: Callable[[Any], Any],
+        last_modified: Optional[datetime] = None,
+        max_age: int = 1
+    ) -> EncodedPayload:
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] is source:
+            self._entries.move_to_end(name)
+            self.hits += 1
+            return entry[1]
+
+        body = build(source)
+        if not isinstance(body, bytes):
+            body = json_dumps(body)
+        payload = EncodedPayload(body, last_modified, max_age)
+        self._entries[name] = (source, payload)
+        self._entries.move_to_end(name)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.encodes += 1
+        return payload
+
+    def snapshot(self) -> Dict:
+        return {
+            "encoder": "orjson" if orjson is not None else "json",
+            "brotli": brotli is not None,
+            "encodes": self.encodes,
+            "hits": self.hits
+        }
+
+
+def parse_csv(value: Optional[str], upper: bool = False, lower: bool = False) -> Optional[Tuple[str, ...]]:
+    """'USDTRY, eurtry' → ('USDTRY', 'EURTRY') (upper=True); boşsa None"""
+    if not value:
+        return None
+    if upper:
+        value = value.upper()
+    elif lower:
+        value = value.lower()
+    parts = (part.strip() for part in value.split(","))
+    items = tuple(dict.fromkeys(part for part in parts if part))
+    return items or None
+
+
+class FragmentCache:
+    """
+    Snapshot başına sembol / alan parçalarını bir kez kodlar.
+    Filtreli yanıtlar bu parçaların byte düzeyinde birleştirilmesiyle oluşur,
+    bütün dict yeniden kodlanmaz.
+    """
+
+    def __init__(self):
+        self._source: Any = None
+        self._fragments: Dict[Hashable, bytes] = {}
+
+    def fragment(self, source: Any, key: Hashable, build: Callable[[], Any]) -> bytes:
+        if source is not self._source:
+            self._source = source
+            self._fragments = {}
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = json_dumps(build())
+            self._fragments[key] = fragment
+        return fragment
+
+
+def project(item: Dict, fields: Optional[Iterable[str]]) -> Dict:
+    """Sadece istenen alanları bırakır (fields None ise hepsi)"""
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
@@ -0,0 +1,147 @@
+"""
+Sembol başına bellek içi fiyat geçmişi - sabit kapasiteli halka tampon
+Her sembol için (zaman, değer) çiftleri iki bitişik array('d') içinde
+tutulur: nokta başına 16 byte, kapasite baştan ayrılır, bellek sabittir.
+Dolunca en eski nokta üzerine yazılır.
+
+Zamanlar eklenme sırasıyla artan olduğundan aralık sorgusu ikili arama
+ile yapılır; halka tampon dolmuşsa iki sıralı parçaya (eski yarı + yeni
+yarı) ayrı ayrı bisect uygulanır.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+
+# Sembol başına varsayılan kapasite: 3 gün boyunca saniyede bir nokta
+HISTORY_CAPACITY = 3 * 24 * 3600
+
+# Tek yanıtta dönecek en fazla nokta (daha uzun aralıklar seyreltilir)
+MAX_POINTS = 5000
+
+
+class SymbolHistory:
+    """Tek sembolün halka tamponu"""
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        # Bir sonraki yazılacak konum ve dolu nokta sayısı
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self.times) + len(self.values)) * self.times.itemsize
+
+    def last(self) -> Optional[Tuple[float, float]]:
+        if not self._size:
+            return None
+        index = (self._head - 1) % self.capacity
+        return self.times[index], self.values[index]
+
+    def append(self, timestamp: float, value: float):
+        """Yeni nokta; saat geri giderse zaman bir öncekine eşitlenir (sıra bozulmaz)"""
+        last = self.last()
+        if last is not None and timestamp < last[0]:
+            timestamp = last[0]
+        self.times[self._head] = timestamp
+        self.values[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        """Eskiden yeniye sıralı fiziksel [başlangıç, bitiş) parçaları"""
+        if self._size < self.capacity:
+            return [(0, self._size)]
+        if self._head == 0:
+            return [(0, self.capacity)]
+        return [(self._head, self.capacity), (0, self._head)]
+
+    def range(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        max_points: Optional[int] = None
+    ) -> Tuple[List[float], List[float]]:
+        """
+        start <= zaman <= end olan noktalar (zamanlar, değerler), eskiden yeniye.
+        max_points aşılırsa eşit aralıklı seçilir (son nokta her zaman dahil);
+        seçim fiziksel indekslerle yapılır, aralığın tamamı kopyalanmaz.
+        """
+        start = -math.inf if start is None else start
+        end = math.inf if end is None else end
+        spans = []
+        for lo, hi in self._segments():
+            first = bisect_left(self.times, start, lo, hi)
+            last = bisect_right(self.times, end, first, hi)
+            if first < last:
+                spans.append((first, last))
+
+        count = sum(last - first for first, last in spans)
+        if max_points is None or count <= max_points:
+            times: List[float] = []
+            values: List[float] = []
+            for first, last in spans:
+                times.extend(self.times[first:last])
+                values.extend(self.values[first:last])
+            return times, values
+
+        step = count / max_points
+        picks = [int(i * step) for i in range(max_points - 1)] + [count - 1]
+        # Mantıksal sıra → fiziksel indeks (en fazla iki parça)
+        head_count = spans[0][1] - spans[0][0]
+        indices = [
+            spans[0][0] + pick if pick < head_count else spans[1][0] + pick - head_count
+            for pick in picks
+        ]
+        return [self.times[i] for i in indices], [self.values[i] for i in indices]
+
+
+class TickHistory:
+    """Sembol → halka tampon; tampon sembol ilk kez geldiğinde ayrılır"""
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.symbols: Dict[str, SymbolHistory] = {}
+        self.appended = 0
+
+    def record(self, timestamp: float, currencies: Dict, symbols: Optional[Iterable[str]] = None):
+        """
+        Snapshot'taki değerleri ekler. symbols: sadece bu semboller (delta'da
+        değişenler); None → tüm semboller.
+        """
+        for symbol in currencies if symbols is None else symbols:
+            value = (currencies.get(symbol) or {}).get("value")
+            if not isinstance(value, (int, float)):
+                continue
+            history = self.symbols.get(symbol)
+            if history is None:
+                history = self.symbols[symbol] = SymbolHistory(self.capacity)
+            history.append(timestamp, float(value))
+            self.appended += 1
+
+    def query(
+        self,
+        symbol: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        max_points: int = MAX_POINTS
+    ) -> Optional[Tuple[List[float], List[float]]]:
+        """Sembol bilinmiyorsa None"""
+        history = self.symbols.get(symbol)
+        if history is None:
+            return None
+        return history.range(start, end, max_points)
+
+    def snapshot(self) -> Dict:
+        return {
+            "capacity_per_symbol": self.capacity,
+            "points": {symbol: len(history) for symbol, history in self.symbols.items()},
+            "memory_bytes": sum(history.nbytes for history in self.symbols.values()),
+            "appended": self.appended
+        }
@@ -0,0 +1,216 @@
+"""
+Tel formatları - json (varsayılan), lite (sürümlü, kompakt) ve bin (ikili)
+lite formatında semboller sabit sıralı bir sayı dizisi olarak gider;
+isimler ve sıra bağlantı başında bir kez 'schema' mesajıyla gönderilir.
+bin aynı sırayı float64 dizisi olarak binary frame'de taşır.
+
+    json:  {"type": "update", "data": {... ~900 byte ...}}
+    lite:  {"t": "u", "ts": 1764078601000, "at": "16:50:01", "p": [42.4326, 49.1061, ...]}
+    bin:   18 byte başlık + 10 x float64 = 98 byte
+
+Sürüm her mesajda tekrarlanmaz; subprotocol (lite.v1 / bin.v1) ve schema mesajı taşır.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+from fastapi import WebSocket
+import math
+import struct
+
+from snapshot_responses import json_dumps
+
+JSON = "json"
+LITE = "lite"
+BIN = "bin"
+# /api/stream: JSON mesajın Server-Sent Events çerçevesi
+SSE = "sse"
+LITE_VERSION = 1
+
+# Binary frame olarak gönderilen formatlar
+BINARY_FORMATS = {BIN}
+
+# Sıra sözleşmenin parçasıdır - değişirse LITE_VERSION artırılmalı
+LITE_SYMBOLS = (
+    "USDTRY", "EURTRY", "GBPTRY", "EURUSD", "XAUUSD",
+    "XAGUSD", "GRAMTRY", "USDJPY", "USDCHF", "DXYUSD"
+)
+
+# Sec-WebSocket-Protocol değeri → format
+SUBPROTOCOLS = {
+    f"lite.v{LITE_VERSION}": LITE,
+    f"bin.v{LITE_VERSION}": BIN,
+    "json": JSON
+}
+
+MESSAGE_TYPES = {"update": "u", "initial": "i", "snapshot": "s", "delta": "d"}
+LITE_INDEX = {symbol: index for index, symbol in enumerate(LITE_SYMBOLS)}
+
+# bin (little-endian):
+#   başlık: tür (1 byte ASCII, t ile aynı), seq (uint32), ts (int64 epoch ms),
+#           at (uint32 gece yarısından saniye, yoksa 0xFFFFFFFF), n (uint8)
+#   i/s/u:  n x float64 - symbols sırasıyla değerler
+#   d:      n x (uint8 indeks, float64 değer)
+#   Eksik değer NaN, bilinmeyen ts 0'dır.
+BIN_HEADER = struct.Struct("<cIqIB")
+BIN_PRICES = struct.Struct(f"<{len(LITE_SYMBOLS)}d")
+BIN_CHANGE = struct.Struct("<Bd")
+BIN_NO_TIME = 0xFFFFFFFF
+
+
+def lite_schema(snapshot: Optional[Dict] = None, fmt: str = LITE) -> Dict:
+    """Bağlantı başında bir kez gönderilen sözlük mesajı (lite ve bin için)"""
+    currencies = (snapshot or {}).get("currencies", {})
+    schema = {
+        "t": "schema",
+        "format": fmt,
+        "v": LITE_VERSION,
+        "symbols": list(LITE_SYMBOLS),
+        "names": {symbol: currencies.get(symbol, {}).get("name") for symbol in LITE_SYMBOLS},
+        "fields": {
+            "t": "mesaj türü (i=initial, s=snapshot, d=delta, u=update)",
+            "s": "sıra numarası",
+            "ts": "epoch ms",
+            "at": "kaynak saati",
+            "p": "symbols sırasıyla değerler",
+            "c": "delta: [symbols indeksi, yeni değer] çiftleri"
+        }
+    }
+    if fmt == BIN:
+        schema["layout"] = {
+            "byte_order": "little",
+            "header": "type:char seq:uint32 ts:int64 at:uint32 n:uint8",
+            "prices": "n x float64 (i, s, u)",
+            "changes": "n x (index:uint8 value:float64) (d)",
+            "missing": "NaN; at=0xFFFFFFFF"
+        }
+    return schema
+
+
+def epoch_ms(timestamp: Optional[str]) -> Optional[int]:
+    if not timestamp:
+        return None
+    try:
+        return int(datetime.fromisoformat(timestamp).timestamp() * 1000)
+    except ValueError:
+        return None
+
+
+def lite_prices(snapshot: Dict) -> List[Optional[float]]:
+    currencies = snapshot.get("currencies", {})
+    return [currencies.get(symbol, {}).get("value") for symbol in LITE_SYMBOLS]
+
+
+def to_lite(snapshot: Dict, message_type: str = "update") -> Dict:
+    """Tam snapshot → lite mesaj (raw_api_data ve tekrar eden isimler olmadan)"""
+    return {
+        "t": MESSAGE_TYPES.get(message_type, message_type),
+        "ts": epoch_ms(snapshot.get("timestamp")),
+        "at": snapshot.get("api_time"),
+        "p": lite_prices(snapshot)
+    }
+
+
+def to_lite_delta(message: Dict) -> Dict:
+    """delta mesajı → {"t": "d", "s", "ts", "at", "c": [[indeks, değer], ...]}"""
+    changes = message.get("changes", {}).get("currencies", {})
+    return {
+        "t": "d",
+        "s": message.get("seq"),
+        "ts": epoch_ms(message.get("timestamp")),
+        "at": message.get("api_time"),
+        "c": [
+            [LITE_INDEX[symbol], (fields or {}).get("value")]
+            for symbol, fields in changes.items()
+            if symbol in LITE_INDEX and (fields is None or "value" in fields)
+        ]
+    }
+
+
+def seconds_of_day(api_time: Optional[str]) -> int:
+    """'16:50:01' → 60601; okunamazsa BIN_NO_TIME"""
+    try:
+        hours, minutes, seconds = (int(part) for part in api_time.split(":"))
+    except (AttributeError, ValueError):
+        return BIN_NO_TIME
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def bin_float(value: Optional[float]) -> float:
+    return math.nan if value is None else float(value)
+
+
+def to_bin(message: Dict) -> bytes:
+    """lite mesajı → bin frame"""
+    header = (
+        message["t"].encode("ascii")[:1],
+        message.get("s") or 0,
+        message.get("ts") or 0,
+        seconds_of_day(message.get("at"))
+    )
+    if message["t"] == "d":
+        changes = message["c"]
+        body = b"".join(BIN_CHANGE.pack(index, bin_float(value)) for index, value in changes)
+        return BIN_HEADER.pack(*header, len(changes)) + body
+    return BIN_HEADER.pack(*header, len(LITE_SYMBOLS)) + BIN_PRICES.pack(*map(bin_float, message["p"]))
+
+
+def lite_message(message: Dict) -> Dict:
+    """{"type", "data"} / delta mesajı → lite yapısı"""
+    if message.get("type") == "delta":
+        return to_lite_delta(message)
+    lite = to_lite(message["data"], message.get("type", "update"))
+    if "seq" in message:
+        lite["s"] = message["seq"]
+    return lite
+
+
+def is_data_message(message: Dict) -> bool:
+    """Fiyat taşıyan mesaj mı (kontrol mesajları her formatta JSON kalır)"""
+    return message.get("type") == "delta" or "data" in message
+
+
+def encode_message(message: Dict, fmt: str) -> bytes:
+    """{"type", "data"} / delta mesajını istenen formatta kodlar"""
+    if fmt == BIN and is_data_message(message):
+        return to_bin(lite_message(message))
+    if fmt == LITE and is_data_message(message):
+        return json_dumps(lite_message(message))
+    return json_dumps(message)
+
+
+def sse_event(message: Dict) -> str:
+    """id: <seq> / event: <type> / data: <json> - Last-Event-ID ile devam için"""
+    lines = []
+    if message.get("seq") is not None:
+        lines.append(f"id: {message['seq']}")
+    lines.append(f"event: {message.get('type', 'message')}")
+    lines.append("data: " + json_dumps(message).decode("utf-8"))
+    return "\n".join(lines) + "\n\n"
+
+
+def encode_frame(message: Dict, fmt: str) -> Union[str, bytes]:
+    """WebSocket frame'i: binary formatta veri mesajları bytes, geri kalanı str"""
+    if fmt == SSE:
+        return sse_event(message)
+    encoded = encode_message(message, fmt)
+    if fmt in BINARY_FORMATS and is_data_message(message):
+        return encoded
+    return encoded.decode("utf-8")
+
+
+def ping_frame(fmt: str) -> str:
+    """Canlılık ping'i: SSE'de yorum satırı, WebSocket'te JSON metin"""
+    if fmt == SSE:
+        return ": ping\n\n"
+    return '{"type":"ping"}'
+
+
+def negotiate(websocket: WebSocket) -> Tuple[str, Optional[str]]:
+    """
+    Önce Sec-WebSocket-Protocol, sonra ?format= sorgu parametresi.
+    (format, kabul edilecek subprotocol) döndürür.
+    """
+    for subprotocol in websocket.scope.get("subprotocols", []):
+        if subprotocol in SUBPROTOCOLS:
+            return SUBPROTOCOLS[subprotocol], subprotocol
+    fmt = websocket.query_params.get("format", JSON)
+    return (fmt if fmt in (JSON, LITE, BIN) else JSON), None